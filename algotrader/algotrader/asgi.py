@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'algotrader.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it loads models
+from trades.streaming import sse_application
+
+
+async def application(scope, receive, send):
+    # Live price streams are served outside Django so one poll per ticker can feed every client
+    if scope["type"] == "http" and scope["path"].startswith("/stream/"):
+        return await sse_application(scope, receive, send)
+    return await django_application(scope, receive, send)
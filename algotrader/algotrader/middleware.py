@@ -0,0 +1,94 @@
+import asyncio
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+from lib.Metrics import registry
+from lib.QuoteCache import quote_cache
+
+REQUESTS = registry.counter("http_requests_total", "Requests served per endpoint", ("endpoint", "method", "status"))
+LATENCY = registry.histogram("http_request_duration_seconds", "View latency per endpoint", ("endpoint", "method"))
+QUERIES = registry.histogram(
+    "http_request_db_queries", "Database queries per request", ("endpoint",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)
+    )
+QUERY_TIME = registry.histogram("http_request_db_seconds", "Seconds spent in the database per request", ("endpoint",))
+
+registry.gauge("quote_cache_entries", "Prices held in the process quote cache", lambda: quote_cache.stats()["size"])
+registry.gauge("quote_cache_hit_ratio", "Share of quote cache lookups served fresh", lambda: quote_cache.stats()["hit_rate"])
+
+# [queries, seconds] of the request being served; context variables follow the
+# request into the threads sync_to_async runs database code in
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counts = _request_queries.get()
+    if counts is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counts[0] += 1
+        counts[1] += time.perf_counter() - start
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    # Connections are per thread, so wrap each one as it is opened
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install_wrapper)
+
+
+def _endpoint(request):
+    match = getattr(request, "resolver_match", None)
+    # The route pattern, not the path, keeps one series per endpoint (not per ticker)
+    return match.route if match is not None else "unmatched"
+
+
+def _record(request, response, start, counts):
+    endpoint = _endpoint(request)
+    LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    QUERIES.observe(counts[0], endpoint=endpoint)
+    QUERY_TIME.observe(counts[1], endpoint=endpoint)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Record latency, status and database query count and time of every request per endpoint
+    """
+    for connection in connections.all():
+        _install_wrapper(None, connection)
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            counts = [0, 0.0]
+            token = _request_queries.set(counts)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _request_queries.reset(token)
+            _record(request, response, start, counts)
+            return response
+    else:
+        def middleware(request):
+            counts = [0, 0.0]
+            token = _request_queries.set(counts)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _request_queries.reset(token)
+            _record(request, response, start, counts)
+            return response
+    return middleware
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 import django_heroku
 
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'algotrader.middleware.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,6 +90,32 @@ DATABASES = {
     }
 }
 
+# On-disk store of downloaded historical bars (see lib/HistoricalStore.py)
+HISTORICAL_STORE = BASE_DIR / 'historical.sqlite3'
+
+# Where market data comes from: "yahoo" (live), "replay" (recorded fixtures,
+# no network) or "record" (live, saving every response as a fixture)
+MARKET_DATA_PROVIDER = os.environ.get('MARKET_DATA_PROVIDER', 'yahoo')
+MARKET_DATA_FIXTURES = Path(os.environ.get('MARKET_DATA_FIXTURES', BASE_DIR / 'fixtures' / 'market_data'))
+
+# Dated fundamentals snapshots the screener filters (see lib/Screener.py)
+SCREENER_SNAPSHOTS = BASE_DIR / 'screener'
+
+# Bearer token required to read /metrics (unset: open, e.g. behind a private network)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Stored quotes younger than this many seconds are used instead of scraping
+QUOTE_MAX_AGE = 60
+
+# Seconds between polls of the refresh_quotes worker
+QUOTE_REFRESH_INTERVAL = 15
+
+# Seconds between price pushes to clients streaming /stream/<ticker> (ASGI only)
+QUOTE_STREAM_INTERVAL = 5
+
+# Most tickers streamed at once; each one polls Yahoo every QUOTE_STREAM_INTERVAL seconds
+QUOTE_STREAM_MAX_CHANNELS = 100
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -16,7 +16,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from .views import home
+from .views import home, metrics_view
 from users.views import *
 from trades.views import *
 
@@ -26,12 +26,16 @@ urlpatterns = [
     path('register/', register_view, name="register"),
     path('login/', login_view, name="login"),
     path('profile/', profile_view, name="profile"),
+    path('profile/transactions/', transactions_view, name="transactions"),
     path('logout/', logout_view, name="logout"),
 
     # Trades
     path('stock/', stock_view, name="stock"),
     path('stock/<str:ticker>', stock_search_view, name="stock"),
+    path('stock/<str:ticker>/chart', chart_view, name="chart"),
+    path('watchlist/', watchlist_view, name="watchlist"),
 
     # Admin
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name="metrics"),
 ]
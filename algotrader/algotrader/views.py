@@ -1,5 +1,14 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from lib.Metrics import registry
 
 # Create your views here.
 def home(request):
-    return render(request, "index.html")
\ No newline at end of file
+    return render(request, "index.html")
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4")
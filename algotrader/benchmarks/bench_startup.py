@@ -0,0 +1,70 @@
+"""
+Measure cold start time: importing the scraper and booting Django, each in a fresh interpreter
+
+Usage (from the algotrader directory):
+    python benchmarks/bench_startup.py [--repeat N] [--settings MODULE]
+
+Every scenario runs in a new python process, so nothing is cached in
+sys.modules between samples. "worker boot" is what a gunicorn worker does
+before serving its first request: django.setup() plus loading the URLconf
+(which imports every view module). The heavy modules column lists which of
+pandas, numpy, bs4 and httpx each scenario ended up importing.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ["pandas", "numpy", "bs4", "httpx"]
+
+SCENARIOS = {
+    "python": "pass",
+    "import lib.YahooScraper": "import lib.YahooScraper",
+    "YahooScraper()": "from lib.YahooScraper import YahooScraper; YahooScraper()",
+    "django.setup()": "import django; django.setup()",
+    "worker boot": (
+        "import django; django.setup()\n"
+        "from django.conf import settings; from django.urls import get_resolver\n"
+        "get_resolver(settings.ROOT_URLCONF).url_patterns"
+        ),
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(code, settings):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--settings", default="algotrader.settings")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<26}{'median ms':>10}{'min ms':>10}  heavy modules")
+    for name, code in SCENARIOS.items():
+        samples = [measure(code, args.settings) for _ in range(args.repeat)]
+        times = [s["elapsed"] * 1000 for s in samples]
+        heavy = ", ".join(samples[-1]["heavy"]) or "-"
+        print(f"{name:<26}{statistics.median(times):>10.1f}{min(times):>10.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
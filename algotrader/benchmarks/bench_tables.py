@@ -0,0 +1,87 @@
+"""
+Benchmark YahooScraper table and price extraction on saved pages, offline
+
+Usage (from the algotrader directory):
+    python benchmarks/bench_tables.py [--pages DIR] [--repeat N]
+
+DIR holds Yahoo Finance pages saved as .html files (e.g. with curl). Without
+--pages a synthetic page shaped like a key-statistics page is used.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.YahooScraper import YahooScraper
+
+
+def make_page(tables=10, rows=12, filler=400):
+    """
+    Build a synthetic Yahoo-like page with many tables buried in markup\n
+
+    :param tables: number of tables\n
+    :param rows: rows per table\n
+    :param filler: number of non-table elements around each table\n
+    :return: page html as bytes
+    """
+    noise = "".join(
+        f'<div class="D(ib) Va(m) Fz(12px)"><span data-reactid="{i}">filler {i}</span></div>'
+        for i in range(filler)
+        )
+    body = []
+    for t in range(tables):
+        trs = "".join(
+            f"<tr><td><span>Metric {t}.{r}</span></td><td>{r * 1.5:.2f}B</td></tr>"
+            for r in range(rows)
+            )
+        body.append(f"<section>{noise}<table><thead><tr><th>Stat {t}</th><th>Value</th></tr></thead><tbody>{trs}</tbody></table></section>")
+
+    header = (
+        '<div id="quote-header-info"><div class="My(6px) Pos(r) smartphone_Mt(6px)">'
+        '<div class="D(ib) Va(m) Maw(65%) Ov(h)"><div>'
+        '<span class="Trsdu(0.3s) Fw(b) Fz(36px) Mb(-4px) D(ib)">1,234.56</span>'
+        "</div></div></div></div>"
+        )
+    return f"<html><head><title>Fixture</title></head><body>{header}{''.join(body)}</body></html>".encode()
+
+
+def load_pages(directory):
+    if directory is None:
+        return {"synthetic": make_page()}
+    return {p.name: p.read_bytes() for p in sorted(Path(directory).glob("*.html"))}
+
+
+def timed(func, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(content)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", help="directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        sys.exit(f"No .html pages found in {args.pages}")
+
+    fast = YahooScraper(parser="lxml")
+    slow = YahooScraper(parser="bs4")
+
+    print(f"{'page':<32}{'tables':>8}{'bs4 ms':>10}{'lxml ms':>10}{'speedup':>9}")
+    for name, content in pages.items():
+        slow_time, slow_tables = timed(slow.parse_tables, content, args.repeat)
+        fast_time, fast_tables = timed(fast.parse_tables, content, args.repeat)
+
+        same = len(slow_tables) == len(fast_tables) and all(a.equals(b) for a, b in zip(slow_tables, fast_tables))
+        flag = "" if same else "  (outputs differ)"
+        print(f"{name[:31]:<32}{len(fast_tables):>8}{slow_time * 1000:>10.2f}{fast_time * 1000:>10.2f}{slow_time / fast_time:>8.1f}x{flag}")
+
+
+if __name__ == "__main__":
+    main()
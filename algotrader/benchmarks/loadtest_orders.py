@@ -0,0 +1,199 @@
+"""
+Fire parallel orders at one account and check that no money or shares are lost
+
+Usage (from the algotrader directory):
+    python benchmarks/loadtest_orders.py [--threads N] [--orders N] [--settings MODULE]
+
+A throwaway test database is created from the configured database settings
+(set DATABASE_URL to load test Postgres like production) and destroyed
+afterwards. Every thread holds its own database connection, like a gunicorn
+worker, and the threads race each other in three rounds:
+
+    buy     buy single shares until the balance runs out
+    sell    sell the same shares from every thread at once (double sells)
+    mixed   random buy_shares / sell_shares / sell against the same account
+
+Afterwards the balance, transactions and position must agree exactly, and
+no order may have failed with a database error (e.g. "database is locked").
+The script exits nonzero otherwise.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def race(threads, work):
+    """
+    Run work(thread index) on every thread at the same moment\n
+
+    :return: tuple of Counter of outcomes and seconds elapsed
+    """
+    from django.db import connection
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def run(i):
+        barrier.wait()
+        try:
+            result = work(i)
+        finally:
+            connection.close()
+        with lock:
+            outcomes.update(result)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return outcomes, time.perf_counter() - start
+
+
+def attempt(outcomes, func, *args):
+    from django.core.exceptions import ObjectDoesNotExist
+    from django.db import DatabaseError
+
+    try:
+        func(*args)
+        outcomes["ok"] += 1
+    except (ValueError, ObjectDoesNotExist):
+        outcomes["rejected"] += 1
+    except DatabaseError as e:
+        # Users would get a server error, so any of these fails the run (see report)
+        outcomes[f"db error: {e.__class__.__name__}"] += 1
+
+
+def check(trader, initial):
+    """
+    Verify the account against its transaction history\n
+
+    :return: list of problems (empty when consistent)
+    """
+    from users.models import Position, Transaction
+
+    trader.refresh_from_db()
+    transactions = Transaction.objects.filter(owner=trader)
+    spent = sum(t.price_purchased for t in transactions)
+    received = sum(t.price_sold for t in transactions.filter(sold=True))
+    unsold = transactions.filter(sold=False)
+
+    problems = []
+    expected = initial - spent + received
+    if abs(trader.balance - expected) > 1e-6:
+        problems.append(f"balance {trader.balance:.2f} != {expected:.2f} implied by transactions")
+    if trader.balance < -1e-6:
+        problems.append(f"negative balance {trader.balance:.2f}")
+
+    for p in Position.objects.filter(owner=trader):
+        held = unsold.filter(stock__iexact=p.stock)
+        cost = sum(t.price_purchased for t in held)
+        if p.quantity != held.count() or abs(p.cost_basis - cost) > 1e-6:
+            problems.append(f"position {p.stock} {p.quantity} @ {p.cost_basis:.2f} != {held.count()} @ {cost:.2f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=50, help="orders per thread in the mixed round")
+    parser.add_argument("--price", type=float, default=10.0)
+    parser.add_argument("--settings", default="algotrader.settings")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", args.settings)
+    import django
+    django.setup()
+
+    from django.db import connection
+    database = connection.settings_dict
+    if database["ENGINE"].endswith("sqlite3"):
+        # A file (not the default in-memory test database) so threads really contend
+        database["OPTIONS"].setdefault("timeout", 30)
+        database["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "loadtest.sqlite3")
+    name = database["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    from users.models import Trader, Transaction
+
+    try:
+        price = args.price
+        initial = price * args.threads * 10
+        trader = Trader.objects.create_user("loadtest", "loadtest@example.com", "loadtest")
+        Trader.objects.filter(pk=trader.pk).update(balance=initial)
+        failed = False
+
+        def report(name, outcomes, elapsed):
+            nonlocal failed
+            problems = check(trader, initial)
+            problems += [f"{count} orders raised {outcome}" for outcome, count in outcomes.items() if outcome.startswith("db error")]
+            failed = failed or bool(problems)
+            total = sum(outcomes.values())
+            summary = ", ".join(f"{k} {v}" for k, v in sorted(outcomes.items()))
+            print(f"{name:<6} {total:>6} orders {elapsed:>7.2f}s {total / elapsed:>8.0f}/s  {summary}")
+            for problem in problems:
+                print(f"       FAIL {problem}")
+
+        # Twice as many buys as the balance can pay for
+        def buy(i):
+            outcomes = Counter()
+            account = Trader.objects.get(pk=trader.pk)
+            for _ in range(20):
+                attempt(outcomes, account.buy, "LOAD", price)
+            return outcomes
+        outcomes, elapsed = race(args.threads, buy)
+        report("buy", outcomes, elapsed)
+        if outcomes["ok"] > args.threads * 10:
+            failed = True
+            print(f"       FAIL {outcomes['ok']} buys paid from a balance that covers {args.threads * 10}")
+
+        # Every thread tries to sell every share, each must be paid exactly once
+        ids = list(Transaction.objects.filter(owner=trader, sold=False).values_list("pk", flat=True))
+        def sell(i):
+            outcomes = Counter()
+            account = Trader.objects.get(pk=trader.pk)
+            for pk in random.sample(ids, len(ids)):
+                attempt(outcomes, account.sell, pk, price * 1.5)
+            return outcomes
+        outcomes, elapsed = race(args.threads, sell)
+        report("sell", outcomes, elapsed)
+        if outcomes["ok"] > len(ids):
+            failed = True
+            print(f"       FAIL {outcomes['ok']} sells of {len(ids)} shares")
+
+        def mixed(i):
+            outcomes = Counter()
+            account = Trader.objects.get(pk=trader.pk)
+            rng = random.Random(i)
+            for _ in range(args.orders):
+                action = rng.random()
+                if action < 0.4:
+                    attempt(outcomes, account.buy_shares, "LOAD", price, rng.randint(1, 3))
+                elif action < 0.7:
+                    attempt(outcomes, account.sell_shares, "LOAD", price, rng.randint(1, 3))
+                else:
+                    owned = Transaction.objects.filter(owner=trader, sold=False).values_list("pk", flat=True)[:5]
+                    pk = rng.choice(list(owned) or [0])
+                    attempt(outcomes, lambda: account.sell(pk, price))
+            return outcomes
+        outcomes, elapsed = race(args.threads, mixed)
+        report("mixed", outcomes, elapsed)
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+
+    print("FAIL" if failed else "OK: balance, transactions and position agree")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import asyncio
+import io
+import time
+import weakref
+
+from lib.YahooScraper import FAILURES, PHASES, YahooScraper
+
+
+class AsyncYahooScraper:
+    def __init__(self, scraper=None, **kwargs):
+        """
+        Asyncio counterpart of YahooScraper for use in async views\n
+
+        Requests go through httpx when it is installed and fall back to the
+        synchronous session in a worker thread otherwise. Parsing, the quote
+        cache and the historical store are shared with the wrapped scraper.\n
+
+        :param scraper: YahooScraper to share parsing, cache and store with (default: new YahooScraper)\n
+        :kwarg workers: maximum concurrent requests per event loop (default: 8)\n
+        :kwarg timeout: request timeout in seconds (default: 10)
+        """
+        self.scraper = scraper or YahooScraper(**kwargs)
+        self.workers = kwargs.get("workers", 8)
+        self.timeout = kwargs.get("timeout", 10)
+
+        # httpx clients and semaphores are bound to one event loop
+        self.loops = weakref.WeakKeyDictionary()
+
+    async def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        state = self.loops.get(loop)
+        if state is None:
+            try:
+                import httpx
+            except ImportError:
+                httpx = None
+
+            client = None
+            if httpx is not None:
+                client = httpx.AsyncClient(
+                    headers=self.scraper.headers,
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers)
+                    )
+            state = self.loops[loop] = {
+                "client": client,
+                "semaphore": asyncio.Semaphore(self.workers),
+            }
+            if client is not None:
+                # asyncio.run (and so async_to_sync under WSGI, with a loop per request)
+                # finalizes open async generators before closing its loop, which closes the client
+                state["closer"] = self._close_with_loop(client)
+                await state["closer"].__anext__()
+        return state
+
+    @staticmethod
+    async def _close_with_loop(client):
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    async def get(self, link):
+        """
+        Download a page\n
+
+        :param link: str link to page\n
+        :return: response body as bytes
+        """
+        state = await self._loop_state()
+        async with state["semaphore"]:
+            fetcher = getattr(self.scraper.provider, "fetcher", self.scraper.fetcher)
+            if state["client"] is None:
+                response = await asyncio.to_thread(fetcher.get, link)
+                return response.content
+
+            # Share the per-host rate limit with the synchronous scraper
+            delay = fetcher.limiter.reserve(link)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            response = await state["client"].get(link)
+            response.raise_for_status()
+            return response.content
+
+    async def fetch(self, kind, ticker, **params):
+        """
+        Get one payload from the scraper's provider\n
+
+        Live providers are requested with this scraper's async client; other
+        providers (e.g. replayed fixtures) are asked directly.\n
+
+        :param kind: payload kind (see MarketDataProvider)\n
+        :param ticker: stock ticker\n
+        :return: payload as bytes
+        """
+        provider = self.scraper.provider
+        start = time.perf_counter()
+        try:
+            if provider.remote:
+                return await self.get(provider.link(kind, ticker, **params))
+            return await provider.afetch(kind, ticker, **params)
+        finally:
+            PHASES.observe(time.perf_counter() - start, phase="fetch", kind=kind)
+
+    async def get_tables(self, link):
+        """
+        Get all tables in Yahoo Finance page\n
+
+        :param link: str link to page\n
+        :return: list of dataframes containing scraped info
+        """
+        content = await self.get(link)
+        with PHASES.time(phase="tables", kind="link"):
+            return self.scraper.parse_tables(content)
+
+    async def get_stock_price(self, ticker):
+        """
+        Scrapes Yahoo Finance for the price of some stock\n
+
+        Fresh prices come from the shared quote cache, and concurrent lookups
+        of the same ticker (from any thread or event loop) share a single fetch.\n
+
+        :param ticker: symbol of stock\n
+        :return: float price of stock
+        """
+        return await self.scraper.quote_cache.aget(ticker.upper(), lambda: self._fetch_stock_price(ticker))
+
+    async def _fetch_stock_price(self, ticker):
+        content = await self.fetch("quote", ticker)
+        with PHASES.time(phase="parse", kind="quote"):
+            return self.scraper.parse_price(content, ticker)
+
+    async def get_stock_prices(self, tickers, **kwargs):
+        """
+        Get the prices of many stocks concurrently\n
+
+        :param tickers: list of stock tickers\n
+        :kwarg cached: serve fresh prices from the quote cache (default: True)\n
+        :return: tuple of dict of ticker to float price and dict of failed ticker to exception
+        """
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if kwargs.get("cached", True):
+            price = self.get_stock_price
+        else:
+            async def price(ticker):
+                value = await self._fetch_stock_price(ticker)
+                self.scraper.quote_cache.set(ticker, value)
+                return value
+
+        prices = await asyncio.gather(*[price(t) for t in tickers], return_exceptions=True)
+        errors = {t: p for t, p in zip(tickers, prices) if isinstance(p, Exception)}
+        if errors:
+            FAILURES.inc(len(errors), kind="quote")
+        return {t: p for t, p in zip(tickers, prices) if not isinstance(p, Exception)}, errors
+
+    async def download_historical(self, stock, period1, period2, interval):
+        """
+        Download historical data for one stock from the provider\n
+
+        :param stock: stock ticker\n
+        :param period1: minimum range of data (unix timestamp)\n
+        :param period2: maximum range of data (unix timestamp)\n
+        :param interval: interval of data (d: daily, wk: weekly, mo: monthly)\n
+        :return: dataframe indexed by date
+        """
+        content = await self.fetch("historical", stock, period1=period1, period2=period2, interval=interval)
+        with PHASES.time(phase="parse", kind="historical"):
+            return self.scraper.parse_historical(io.BytesIO(content))
+
+    async def get_historical(self, stocks, **kwargs):
+        """
+        Scrape Yahoo Finance for historical data, all stocks concurrently\n
+
+        Takes the same keyword arguments as YahooScraper.get_historical.\n
+
+        :param stocks: list of stock tickers\n
+        :return: dataframe of resulting data
+        """
+        import pandas as pd
+
+        period1, period2, interval = self.scraper.historical_range(**kwargs)
+        oneline = kwargs.get("oneline", False)
+        tidy = kwargs.get("tidy", False)
+        store = self.scraper.store
+
+        if not (oneline or tidy) and len(stocks) > 1:
+            raise Exception("Multi-line output only available for one stock at a time")
+
+        async def historical(stock):
+            if store is None:
+                df = await self.download_historical(stock, period1, period2, interval)
+            else:
+                gaps = await asyncio.to_thread(store.missing, stock, interval, period1, period2)
+                for start, end in gaps:
+                    df = await self.download_historical(stock, start, end, interval)
+                    await asyncio.to_thread(store.save, stock, interval, df, start, end)
+                df = await asyncio.to_thread(store.load, stock, interval, period1, period2)
+
+            if tidy:
+                return self.scraper.tidy_historical(stock, df)
+            elif oneline:
+                return self.scraper.flatten_historical(stock, df)
+            return df
+
+        if not (oneline or tidy):
+            return await historical(stocks[0])
+
+        results = await asyncio.gather(*[historical(s) for s in stocks], return_exceptions=True)
+        failed = {s: r for s, r in zip(stocks, results) if isinstance(r, Exception)}
+        if failed:
+            FAILURES.inc(len(failed), kind="historical")
+            if kwargs.get("errors") is not None:
+                kwargs["errors"].update(failed)
+
+        frames = [r for r in results if not isinstance(r, Exception)]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames)
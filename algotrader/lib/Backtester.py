@@ -0,0 +1,187 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib import Indicators
+
+# Bars per year used to annualize returns for each get_historical interval
+PERIODS_PER_YEAR = {"d": 252, "wk": 52, "mo": 12}
+
+
+def sma_crossover(closes, fast=20, slow=50):
+    """
+    Long while the fast moving average is above the slow one\n
+
+    :param closes: dataframe of close prices, one column per ticker\n
+    :param fast: fast window in bars\n
+    :param slow: slow window in bars\n
+    :return: dataframe of target positions (0 or 1)
+    """
+    return (Indicators.sma(closes, fast) > Indicators.sma(closes, slow)).astype("float64")
+
+
+def momentum(closes, lookback=60):
+    """
+    Long while the return over the lookback window is positive\n
+
+    :param closes: dataframe of close prices, one column per ticker\n
+    :param lookback: window in bars\n
+    :return: dataframe of target positions (0 or 1)
+    """
+    return (closes.pct_change(lookback, fill_method=None) > 0).astype("float64")
+
+
+def mean_reversion(closes, window=20, threshold=1.0):
+    """
+    Long while the price is more than threshold standard deviations below its mean\n
+
+    :param closes: dataframe of close prices, one column per ticker\n
+    :param window: window in bars\n
+    :param threshold: z-score below which to buy\n
+    :return: dataframe of target positions (0 or 1)
+    """
+    middle, upper, lower = Indicators.bollinger(closes, window, threshold)
+    return (closes < lower).astype("float64")
+
+
+STRATEGIES = {
+    "sma_crossover": sma_crossover,
+    "momentum": momentum,
+    "mean_reversion": mean_reversion,
+}
+
+
+class BacktestResult:
+    def __init__(self, **kwargs):
+        """
+        Output of Backtester.run\n
+
+        :kwarg positions: dataframe of positions held during each bar\n
+        :kwarg fills: dataframe of fill prices on the bar each trade executes (NaN where nothing traded)\n
+        :kwarg returns: dataframe of per-bar strategy returns after costs\n
+        :kwarg equity: dataframe of equity curves\n
+        :kwarg drawdown: dataframe of drawdowns from the running peak\n
+        :kwarg stats: dataframe of summary statistics, one row per ticker\n
+        :kwarg bars: number of (date, ticker) bars simulated\n
+        :kwarg elapsed: seconds spent simulating
+        """
+        self.positions = kwargs["positions"]
+        self.fills = kwargs["fills"]
+        self.returns = kwargs["returns"]
+        self.equity = kwargs["equity"]
+        self.drawdown = kwargs["drawdown"]
+        self.stats = kwargs["stats"]
+        self.bars = kwargs["bars"]
+        self.elapsed = kwargs["elapsed"]
+
+    @property
+    def bars_per_second(self):
+        return self.bars / self.elapsed if self.elapsed else float("inf")
+
+    def __repr__(self):
+        return f"<BacktestResult {self.stats.shape[0]} tickers, {self.bars} bars, {self.bars_per_second:,.0f} bars/s>"
+
+
+class Backtester:
+    def __init__(self, closes, **kwargs):
+        """
+        Vectorized backtesting engine over many tickers at once\n
+
+        Strategies map a frame of closes to target positions. A signal computed
+        at the close of one bar is filled at the close of the next bar, and the
+        position earns returns from that fill price on, so a strategy never
+        trades on the bar it is computed from.\n
+
+        :param closes: dataframe of close prices with a DatetimeIndex, one column per ticker\n
+        :kwarg cash: starting equity per ticker (default: 10000)\n
+        :kwarg commission: cost per unit of turnover as a fraction of value (default: 0.001)\n
+        :kwarg interval: bar interval used to annualize statistics (default: "d")
+        """
+        if not closes.index.is_monotonic_increasing:
+            closes = closes.sort_index()
+        # Copy-on-write keeps this a view when closes is already float64, e.g. over shared memory
+        self.closes = closes.astype("float64")
+        self.cash = kwargs.get("cash", 10000.0)
+        self.commission = kwargs.get("commission", 0.001)
+        self.periods_per_year = PERIODS_PER_YEAR.get(kwargs.get("interval", "d"), 252)
+
+        prices = self.closes.to_numpy()
+        previous = np.vstack([np.full((1, prices.shape[1]), np.nan), prices[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.bar_returns = np.nan_to_num(prices / previous - 1, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def run(self, strategy, **params):
+        """
+        Simulate a strategy over every ticker\n
+
+        :param strategy: callable (closes, **params) -> target positions, or a name in STRATEGIES\n
+        :return: BacktestResult
+        """
+        if isinstance(strategy, str):
+            strategy = STRATEGIES[strategy]
+
+        start = time.perf_counter()
+        closes = self.closes
+        signals = strategy(closes, **params)
+        signals = signals.reindex_like(closes).to_numpy(dtype="float64")
+        signals = np.nan_to_num(signals, nan=0.0)
+
+        # A signal computed at the close of bar t trades at the close of bar t + 1,
+        # so the position first earns the return from close t + 1 to close t + 2
+        positions = np.zeros_like(signals)
+        positions[2:] = signals[:-2]
+
+        # Trades happen at the close of the bar before the position they open is held,
+        # which is where both their fill price and their commission are booked
+        turnover = np.zeros_like(positions)
+        turnover[:-1] = np.abs(np.diff(positions, axis=0))
+
+        returns = positions * self.bar_returns - turnover * self.commission
+        equity = self.cash * np.cumprod(1 + returns, axis=0)
+        peak = np.maximum.accumulate(equity, axis=0)
+        drawdown = equity / peak - 1
+
+        traded = turnover > 0
+        fills = np.where(traded, closes.to_numpy(), np.nan)
+        elapsed = time.perf_counter() - start
+
+        def frame(values):
+            return pd.DataFrame(values, index=closes.index, columns=closes.columns)
+
+        return BacktestResult(
+            positions=frame(positions),
+            fills=frame(fills),
+            returns=frame(returns),
+            equity=frame(equity),
+            drawdown=frame(drawdown),
+            stats=self.statistics(returns, equity, drawdown, traded, positions),
+            bars=int(closes.notna().to_numpy().sum()),
+            elapsed=elapsed
+            )
+
+    def statistics(self, returns, equity, drawdown, traded, positions):
+        """
+        Summarize simulated arrays\n
+
+        :return: dataframe with total return, CAGR, Sharpe ratio, max drawdown, trades and exposure per ticker
+        """
+        n = max(len(returns), 1)
+        years = n / self.periods_per_year
+        final = equity[-1] if len(equity) else np.full(returns.shape[1], self.cash)
+        total = final / self.cash - 1
+
+        mean = returns.mean(axis=0) if len(returns) else np.zeros(returns.shape[1])
+        std = returns.std(axis=0, ddof=1) if len(returns) > 1 else np.zeros(returns.shape[1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 0, mean / std * np.sqrt(self.periods_per_year), 0.0)
+            cagr = np.where(final > 0, (final / self.cash) ** (1 / years) - 1, -1.0)
+
+        return pd.DataFrame({
+            "total_return": total,
+            "cagr": cagr,
+            "sharpe": sharpe,
+            "max_drawdown": drawdown.min(axis=0) if len(drawdown) else 0.0,
+            "trades": traded.sum(axis=0),
+            "exposure": (positions != 0).mean(axis=0) if len(positions) else 0.0,
+        }, index=self.closes.columns)
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RateLimiter:
+    def __init__(self, rate=None):
+        """
+        Per-host rate limiter shared between worker threads\n
+
+        :param rate: maximum requests per second to a single host (None for unlimited)
+        """
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def reserve(self, url):
+        """
+        Reserve the next request slot for the host of url\n
+
+        :param url: url about to be requested\n
+        :return: seconds to wait before sending the request
+        """
+        if not self.interval:
+            return 0
+
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        return slot - now
+
+    def wait(self, url):
+        """
+        Block until a request to the host of url is allowed\n
+
+        :param url: url about to be requested
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BatchResult:
+    def __init__(self, key, value=None, error=None):
+        """
+        Outcome of one item in a batch\n
+
+        :param key: item the job was run for (e.g. ticker)\n
+        :param value: return value of the job\n
+        :param error: exception raised by the job, if any
+        """
+        self.key = key
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return f"<BatchResult {self.key}: {status}>"
+
+
+class BatchFetcher:
+    def __init__(self, **kwargs):
+        """
+        Concurrent HTTP fetcher with a pooled keep-alive session\n
+
+        :kwarg workers: number of worker threads (default: 8)\n
+        :kwarg rate: maximum requests per second per host (default: 10, None for unlimited)\n
+        :kwarg timeout: request timeout in seconds (default: 10)\n
+        :kwarg headers: headers sent with every request
+        """
+        self.workers = kwargs.get("workers", 8)
+        self.timeout = kwargs.get("timeout", 10)
+        self.limiter = RateLimiter(kwargs.get("rate", 10))
+
+        self.session = requests.Session()
+        self.session.headers.update(kwargs.get("headers", {}))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(self.workers, 10))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, **kwargs):
+        """
+        Rate limited GET through the shared session\n
+
+        :param url: url to request\n
+        :return: requests.Response
+        """
+        self.limiter.wait(url)
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def map(self, func, keys):
+        """
+        Run func over keys concurrently\n
+
+        :param func: callable taking a single key\n
+        :param keys: list of keys (e.g. tickers)\n
+        :return: list of BatchResult in the same order as keys
+        """
+        def run(key):
+            try:
+                return BatchResult(key, value=func(key))
+            except Exception as e:
+                return BatchResult(key, error=e)
+
+        keys = list(keys)
+        if len(keys) <= 1 or self.workers <= 1:
+            return [run(key) for key in keys]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as pool:
+            return list(pool.map(run, keys))
@@ -0,0 +1,89 @@
+"""
+Reduce price histories to a bounded number of points for charts\n
+
+lttb picks the points of a line that keep its visual shape (peaks and
+troughs survive), ohlc merges runs of consecutive bars into candles. Both
+return at most the requested number of points, so a chart payload stays the
+same size whatever range it covers.
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb(y, points, x=None):
+    """
+    Largest-Triangle-Three-Buckets downsampling\n
+
+    The first and last values are always kept. The values between are split
+    into points - 2 buckets, and from each bucket the value forming the
+    largest triangle with the previously kept value and the average of the
+    next bucket is kept.\n
+
+    :param y: values in order, without NaN\n
+    :param points: number of values to keep (at least 3)\n
+    :param x: positions of the values (default: evenly spaced)\n
+    :return: ascending int array of the indices to keep
+    """
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        raise ValueError("lttb needs at least 3 points")
+    x = np.arange(n, dtype="float64") if x is None else np.asarray(x, dtype="float64")
+
+    # Bucket i covers edges[i]:edges[i + 1]; n > points makes every bucket non-empty
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Twice the triangle area; the factor does not change the argmax
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def ohlc(df, points):
+    """
+    Merge consecutive bars into at most points candles\n
+
+    Open is the first bar's open, High and Low the extremes, Close the last
+    bar's close and Volume the sum. Any other column (e.g. an indicator) takes
+    the value of the last bar in the candle.\n
+
+    :param df: dataframe with Open, High, Low and Close columns in time order\n
+    :param points: maximum number of candles\n
+    :return: dataframe of candles indexed by the first bar of each
+    """
+    n = len(df)
+    if points >= n:
+        return df
+    if points < 1:
+        raise ValueError("ohlc needs at least 1 point")
+
+    starts = np.linspace(0, n, points + 1).astype(np.int64)[:-1]
+    lasts = np.append(starts[1:] - 1, n - 1)
+
+    candles = {}
+    for column in df.columns:
+        values = df[column].to_numpy(dtype="float64")
+        if column == "Open":
+            candles[column] = values[starts]
+        elif column == "High":
+            candles[column] = np.fmax.reduceat(values, starts)
+        elif column == "Low":
+            candles[column] = np.fmin.reduceat(values, starts)
+        elif column == "Volume":
+            candles[column] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            candles[column] = values[lasts]
+    return pd.DataFrame(candles, index=df.index[starts])
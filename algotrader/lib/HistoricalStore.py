@@ -0,0 +1,324 @@
+import sqlite3
+import threading
+import time
+
+# Yahoo CSV column -> store column
+COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+# Bars newer than this many seconds before the start of today may still change
+UNSETTLED = {"d": 0, "wk": 7 * 86400, "mo": 31 * 86400}
+
+# Seconds a download of the unsettled tail (e.g. today's bar) is reused before it is fetched again
+TAIL_TTL = 15 * 60
+
+
+class HistoricalStore:
+    def __init__(self, path):
+        """
+        On-disk SQLite store of historical bars that remembers which ranges it holds,
+        and of financial statements with the time they were downloaded\n
+
+        Tickers are stored in upper case, whatever case they are passed in.
+        Settled ranges stay covered for good; the unsettled tail of the last
+        download (bars that may still change) counts as covered for TAIL_TTL.\n
+
+        :param path: path to the sqlite database file (created if missing)
+        """
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, adj_close REAL,
+                    volume INTEGER,
+                    PRIMARY KEY (ticker, interval, date)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS coverage_key ON coverage (ticker, interval)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS tails (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    fetched INTEGER NOT NULL,
+                    PRIMARY KEY (ticker, interval)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS statements (
+                    ticker TEXT NOT NULL,
+                    statement TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    value REAL,
+                    PRIMARY KEY (ticker, statement, period, item)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS statement_fetches (
+                    ticker TEXT NOT NULL,
+                    statement TEXT NOT NULL,
+                    fetched INTEGER NOT NULL,
+                    PRIMARY KEY (ticker, statement)
+                )""")
+
+    def ranges(self, ticker, interval):
+        """
+        Get the ranges already stored for a ticker\n
+
+        :param ticker: stock ticker\n
+        :param interval: bar interval (d, wk, mo)\n
+        :return: sorted list of (start, end) unix timestamps
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT start, end FROM coverage WHERE ticker = ? AND interval = ? ORDER BY start",
+                (ticker.upper(), interval)
+                ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def _tail(self, ticker, interval):
+        # Range covered by a recent download of the unsettled tail, or None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT start, fetched FROM tails WHERE ticker = ? AND interval = ?", (ticker.upper(), interval)
+                ).fetchone()
+        if row is None or time.time() - row[1] >= TAIL_TTL:
+            return None
+        return row[0], row[1] + TAIL_TTL
+
+    def missing(self, ticker, interval, period1, period2):
+        """
+        Get the parts of [period1, period2] that still have to be downloaded\n
+
+        :param ticker: stock ticker\n
+        :param interval: bar interval (d, wk, mo)\n
+        :param period1: start of range (unix timestamp)\n
+        :param period2: end of range (unix timestamp)\n
+        :return: list of (start, end) unix timestamps
+        """
+        covered = self.ranges(ticker, interval)
+        tail = self._tail(ticker, interval)
+        if tail is not None:
+            covered = sorted(covered + [tail])
+
+        gaps = []
+        cursor = period1
+        for start, end in covered:
+            if end <= cursor:
+                continue
+            if start >= period2:
+                break
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+
+        if cursor < period2:
+            gaps.append((cursor, period2))
+        return gaps
+
+    def save(self, ticker, interval, df, period1, period2):
+        """
+        Store downloaded bars and mark the range as covered: its settled part for
+        good, the rest up to now for TAIL_TTL\n
+
+        :param ticker: stock ticker\n
+        :param interval: bar interval (d, wk, mo)\n
+        :param df: dataframe of Yahoo CSV columns indexed by date\n
+        :param period1: start of the downloaded range (unix timestamp)\n
+        :param period2: end of the downloaded range (unix timestamp)
+        """
+        import pandas as pd
+
+        ticker = ticker.upper()
+        bars = df.rename(columns=COLUMNS)[list(COLUMNS.values())]
+        bars = bars.astype(object).where(bars.notna(), None)
+        dates = pd.DatetimeIndex(df.index).strftime("%Y-%m-%d")
+        rows = [
+            (ticker, interval, date, *values)
+            for date, values in zip(dates, bars.itertuples(index=False, name=None))
+            ]
+
+        now = round(time.time())
+        # Start of the current UTC day
+        settled = now - now % 86400 - UNSETTLED.get(interval, 0)
+        tail = max(period1, settled)
+        recent = self._tail(ticker, interval)
+        if recent is not None and recent[0] <= period1 <= recent[1]:
+            # Extends the recent tail download rather than replacing it
+            tail = min(tail, recent[0])
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            if period1 < min(period2, settled):
+                self._cover(ticker, interval, period1, min(period2, settled))
+            if period2 > settled:
+                # The tail was downloaded up to now, whatever period2 asked for
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO tails VALUES (?, ?, ?, ?)", (ticker, interval, tail, now)
+                    )
+
+    def _cover(self, ticker, interval, period1, period2):
+        # Merge [period1, period2] with every range it touches
+        overlapping = self.conn.execute(
+            "SELECT rowid, start, end FROM coverage WHERE ticker = ? AND interval = ? AND start <= ? AND end >= ?",
+            (ticker, interval, period2, period1)
+            ).fetchall()
+        for rowid, start, end in overlapping:
+            period1 = min(period1, start)
+            period2 = max(period2, end)
+            self.conn.execute("DELETE FROM coverage WHERE rowid = ?", (rowid,))
+
+        self.conn.execute(
+            "INSERT INTO coverage VALUES (?, ?, ?, ?)", (ticker, interval, period1, period2)
+            )
+
+    def load(self, ticker, interval, period1, period2):
+        """
+        Read stored bars in a range\n
+
+        :param ticker: stock ticker\n
+        :param interval: bar interval (d, wk, mo)\n
+        :param period1: start of range (unix timestamp)\n
+        :param period2: end of range (unix timestamp)\n
+        :return: dataframe of Yahoo CSV columns with a DatetimeIndex
+        """
+        import pandas as pd
+
+        first = time.strftime("%Y-%m-%d", time.gmtime(period1))
+        last = time.strftime("%Y-%m-%d", time.gmtime(period2))
+        with self.lock:
+            df = pd.read_sql_query(
+                "SELECT date, open, high, low, close, adj_close, volume FROM bars "
+                "WHERE ticker = ? AND interval = ? AND date >= ? AND date <= ? ORDER BY date",
+                self.conn,
+                params=(ticker.upper(), interval, first, last),
+                parse_dates=["date"]
+                )
+
+        df = df.rename(columns={"date": "Date", **{v: k for k, v in COLUMNS.items()}})
+        return df.set_index("Date")
+
+    def load_many(self, tickers, interval, period1, period2, field="Close"):
+        """
+        Read one field of stored bars for many tickers as a wide frame\n
+
+        :param tickers: list of stock tickers\n
+        :param interval: bar interval (d, wk, mo)\n
+        :param period1: start of range (unix timestamp)\n
+        :param period2: end of range (unix timestamp)\n
+        :param field: Yahoo CSV column to read (default: Close)\n
+        :return: dataframe with a DatetimeIndex and one column per ticker
+        """
+        import pandas as pd
+
+        column = COLUMNS[field]
+        tickers = [t.upper() for t in tickers]
+        first = time.strftime("%Y-%m-%d", time.gmtime(period1))
+        last = time.strftime("%Y-%m-%d", time.gmtime(period2))
+        marks = ", ".join("?" * len(tickers))
+        with self.lock:
+            df = pd.read_sql_query(
+                f"SELECT date, ticker, {column} AS value FROM bars "
+                f"WHERE interval = ? AND ticker IN ({marks}) AND date >= ? AND date <= ?",
+                self.conn,
+                params=(interval, *tickers, first, last),
+                parse_dates=["date"]
+                )
+
+        wide = df.pivot(index="date", columns="ticker", values="value")
+        wide = wide.reindex(columns=list(tickers)).sort_index()
+        wide.index.name = "Date"
+        wide.columns.name = None
+        return wide
+
+    def save_statement(self, ticker, statement, df):
+        """
+        Replace the stored periods of a financial statement and mark it fetched now\n
+
+        :param ticker: stock ticker\n
+        :param statement: statement kind (income, balance, cashflow)\n
+        :param df: dataframe of line items (columns) per period (index)
+        """
+        ticker = ticker.upper()
+        values = df.astype(object).where(df.notna(), None)
+        rows = [
+            (ticker, statement, str(period), item, position, value)
+            for period, row in zip(df.index, values.itertuples(index=False, name=None))
+            for position, (item, value) in enumerate(zip(df.columns, row))
+            ]
+
+        with self.lock, self.conn:
+            # Restated figures replace the old ones, so drop every stored period first
+            self.conn.execute("DELETE FROM statements WHERE ticker = ? AND statement = ?", (ticker, statement))
+            self.conn.executemany("INSERT INTO statements VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO statement_fetches VALUES (?, ?, ?)", (ticker, statement, round(time.time()))
+                )
+
+    def load_statement(self, ticker, statement, max_age=None):
+        """
+        Read a stored financial statement\n
+
+        :param ticker: stock ticker\n
+        :param statement: statement kind (income, balance, cashflow)\n
+        :param max_age: seconds after which a download counts as stale (default: None, never)\n
+        :return: dataframe of line items per period in page order, or None if missing or stale
+        """
+        import pandas as pd
+
+        ticker = ticker.upper()
+        with self.lock:
+            fetched = self.conn.execute(
+                "SELECT fetched FROM statement_fetches WHERE ticker = ? AND statement = ?", (ticker, statement)
+                ).fetchone()
+            if fetched is None or (max_age is not None and time.time() - fetched[0] > max_age):
+                return None
+            df = pd.read_sql_query(
+                "SELECT period, item, position, value FROM statements WHERE ticker = ? AND statement = ?",
+                self.conn,
+                params=(ticker, statement)
+                )
+
+        items = df.drop_duplicates("item").sort_values("position")["item"]
+        # Trailing twelve months first, then the newest fiscal period, as on the page
+        periods = set(df["period"])
+        order = ["TTM"] * ("TTM" in periods) + sorted(periods - {"TTM"}, reverse=True)
+        wide = df.pivot(index="period", columns="item", values="value").astype("float64")
+        wide = wide.reindex(index=order, columns=list(items))
+        wide.index.name = "period"
+        wide.columns.name = None
+        return wide
+
+    def clear(self, ticker=None):
+        """
+        Delete stored bars, coverage and statements\n
+
+        :param ticker: only clear this ticker (default: everything)
+        """
+        where, params = ("WHERE ticker = ?", (ticker.upper(),)) if ticker else ("", ())
+        with self.lock, self.conn:
+            self.conn.execute(f"DELETE FROM bars {where}", params)
+            self.conn.execute(f"DELETE FROM coverage {where}", params)
+            self.conn.execute(f"DELETE FROM tails {where}", params)
+            self.conn.execute(f"DELETE FROM statements {where}", params)
+            self.conn.execute(f"DELETE FROM statement_fetches {where}", params)
@@ -0,0 +1,390 @@
+"""
+Technical indicators in two modes that produce the same numbers\n
+
+Batch functions take a pandas Series (one ticker) or DataFrame (one column per
+ticker) and compute the indicator over the whole history with vectorized
+pandas operations. Streaming classes keep rolling state in __slots__ and update
+in constant time per bar, for live quotes. Both modes perform the same floating
+point operations in the same order and share warm-up periods (NaN in batch
+mode, None in streaming mode), so they return identical numbers.
+
+Missing bars (NaN) are skipped the same way in both modes: moving averages hold
+their last value, and window sums stay incomplete until window valid bars follow.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+# Batch mode
+
+def _rolling_sum(values, window):
+    # Window sums as differences of a running total, the same arithmetic the
+    # streaming SMA and BollingerBands classes perform bar by bar
+    array = values.to_numpy(dtype="float64")
+    valid = ~np.isnan(array)
+    total = np.cumsum(np.where(valid, array, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+
+    lagged = np.zeros_like(total)
+    lagged_count = np.zeros_like(count)
+    lagged[window:] = total[:-window]
+    lagged_count[window:] = count[:-window]
+
+    sums = total - lagged
+    sums[count - lagged_count < window] = np.nan
+    return sums
+
+
+def _like(values, array):
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(array, index=values.index, columns=values.columns)
+    return pd.Series(array, index=values.index, name=values.name)
+
+
+def sma(values, window=20):
+    """
+    Simple moving average\n
+
+    :param values: series or dataframe of prices\n
+    :param window: window in bars\n
+    :return: same shape as values, NaN during warm-up
+    """
+    return _like(values, _rolling_sum(values, window) / window)
+
+
+def ema(values, window=20):
+    """
+    Exponential moving average with alpha = 2 / (window + 1), seeded with the first value\n
+
+    :param values: series or dataframe of prices\n
+    :param window: span in bars\n
+    :return: same shape as values, NaN during warm-up
+    """
+    return values.ewm(span=window, adjust=False, ignore_na=True, min_periods=window).mean()
+
+
+def rsi(values, window=14):
+    """
+    Relative strength index with Wilder smoothing\n
+
+    :param values: series or dataframe of prices\n
+    :param window: window in bars\n
+    :return: same shape as values (0 to 100), NaN during warm-up
+    """
+    change = values.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / window, adjust=False, ignore_na=True, min_periods=window).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / window, adjust=False, ignore_na=True, min_periods=window).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100 - 100 / (1 + gain / loss)
+    # No losses at all in the window means maximum strength
+    return strength.where(loss != 0, 100.0).where(gain.notna())
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """
+    Moving average convergence divergence\n
+
+    :param values: series or dataframe of prices\n
+    :param fast: fast EMA span\n
+    :param slow: slow EMA span\n
+    :param signal: signal line EMA span\n
+    :return: tuple of macd line, signal line and histogram
+    """
+    line = values.ewm(span=fast, adjust=False, ignore_na=True).mean() - values.ewm(span=slow, adjust=False, ignore_na=True).mean()
+    signal_line = line.ewm(span=signal, adjust=False, ignore_na=True).mean()
+    return line, signal_line, line - signal_line
+
+
+def bollinger(values, window=20, width=2.0):
+    """
+    Bollinger bands around a simple moving average (population standard deviation)\n
+
+    :param values: series or dataframe of prices\n
+    :param window: window in bars\n
+    :param width: band width in standard deviations\n
+    :return: tuple of middle, upper and lower bands, NaN during warm-up
+    """
+    middle = _rolling_sum(values, window) / window
+    squares = _rolling_sum(values * values, window) / window
+    deviation = np.sqrt(np.maximum(squares - middle * middle, 0.0))
+    return (
+        _like(values, middle),
+        _like(values, middle + width * deviation),
+        _like(values, middle - width * deviation),
+        )
+
+
+def atr(high, low, close, window=14):
+    """
+    Average true range with Wilder smoothing\n
+
+    :param high: series or dataframe of highs\n
+    :param low: series or dataframe of lows\n
+    :param close: series or dataframe of closes\n
+    :param window: window in bars\n
+    :return: same shape as close, NaN during warm-up
+    """
+    previous = close.shift(1)
+    # fmax skips the NaN gaps of the first bar, like the streaming ATR
+    true_range = np.fmax(high - low, np.fmax((high - previous).abs(), (low - previous).abs()))
+    return true_range.ewm(alpha=1 / window, adjust=False, ignore_na=True, min_periods=window).mean()
+
+
+def indicators(df, **kwargs):
+    """
+    Compute every indicator over a get_historical dataframe\n
+
+    :param df: dataframe with High, Low and Close columns\n
+    :kwarg sma, ema, rsi, bollinger, atr: windows (defaults: 20, 20, 14, 20, 14)\n
+    :return: dataframe of indicator columns with the same index as df
+    """
+    close = df["Close"]
+    line, signal_line, histogram = macd(close)
+    middle, upper, lower = bollinger(close, kwargs.get("bollinger", 20))
+    return pd.DataFrame({
+        "sma": sma(close, kwargs.get("sma", 20)),
+        "ema": ema(close, kwargs.get("ema", 20)),
+        "rsi": rsi(close, kwargs.get("rsi", 14)),
+        "macd": line,
+        "macd_signal": signal_line,
+        "macd_histogram": histogram,
+        "bollinger_middle": middle,
+        "bollinger_upper": upper,
+        "bollinger_lower": lower,
+        "atr": atr(df["High"], df["Low"], close, kwargs.get("atr", 14)),
+    }, index=df.index)
+
+
+# Streaming mode
+
+class _Smoother:
+    """
+    Exponential smoothing recurrence shared by the streaming indicators
+    """
+    __slots__ = ("alpha", "window", "count", "value")
+
+    def __init__(self, alpha, window=1):
+        self.alpha = alpha
+        self.window = window
+        self.count = 0
+        self.value = None
+
+    def update(self, x):
+        # NaN is skipped and the last value held, like ewm(ignore_na=True)
+        if not math.isnan(x):
+            self.count += 1
+            self.value = x if self.value is None else (1 - self.alpha) * self.value + self.alpha * x
+        return self.value if self.count >= self.window else None
+
+
+class _RollingSum:
+    """
+    Window sum kept as the difference of a running total and its value window bars ago
+    """
+    __slots__ = ("window", "total", "count", "totals")
+
+    def __init__(self, window):
+        self.window = window
+        self.total = 0.0
+        self.count = 0
+        self.totals = deque(maxlen=window + 1)
+
+    def update(self, x):
+        # NaN adds nothing and leaves its windows incomplete, like _rolling_sum
+        if not math.isnan(x):
+            self.total += x
+            self.count += 1
+        self.totals.append((self.total, self.count))
+        if len(self.totals) < self.window:
+            return None
+        lagged, lagged_count = self.totals[0] if len(self.totals) > self.window else (0.0, 0)
+        if self.count - lagged_count < self.window:
+            return None
+        return self.total - lagged
+
+
+class SMA:
+    __slots__ = ("window", "sum", "value")
+
+    def __init__(self, window=20):
+        """
+        Streaming simple moving average\n
+
+        :param window: window in bars
+        """
+        self.window = window
+        self.sum = _RollingSum(window)
+        self.value = None
+
+    def update(self, price):
+        """
+        Add a bar\n
+
+        :param price: latest price\n
+        :return: current average, or None during warm-up
+        """
+        total = self.sum.update(price)
+        self.value = None if total is None else total / self.window
+        return self.value
+
+
+class EMA:
+    __slots__ = ("smoother", "value")
+
+    def __init__(self, window=20):
+        """
+        Streaming exponential moving average\n
+
+        :param window: span in bars
+        """
+        self.smoother = _Smoother(2 / (window + 1), window)
+        self.value = None
+
+    def update(self, price):
+        """
+        Add a bar\n
+
+        :param price: latest price\n
+        :return: current average, or None during warm-up
+        """
+        self.value = self.smoother.update(price)
+        return self.value
+
+
+class RSI:
+    __slots__ = ("gain", "loss", "previous", "value")
+
+    def __init__(self, window=14):
+        """
+        Streaming relative strength index with Wilder smoothing\n
+
+        :param window: window in bars
+        """
+        self.gain = _Smoother(1 / window, window)
+        self.loss = _Smoother(1 / window, window)
+        self.previous = None
+        self.value = None
+
+    def update(self, price):
+        """
+        Add a bar\n
+
+        :param price: latest price\n
+        :return: current RSI (0 to 100), or None during warm-up
+        """
+        previous, self.previous = self.previous, price
+        if previous is None:
+            return None
+
+        change = price - previous
+        gain = self.gain.update(max(change, 0.0))
+        loss = self.loss.update(max(-change, 0.0))
+        if gain is None:
+            self.value = None
+        elif loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - 100 / (1 + gain / loss)
+        return self.value
+
+
+class MACD:
+    __slots__ = ("fast", "slow", "signal", "value")
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        """
+        Streaming moving average convergence divergence\n
+
+        :param fast: fast EMA span\n
+        :param slow: slow EMA span\n
+        :param signal: signal line EMA span
+        """
+        self.fast = _Smoother(2 / (fast + 1))
+        self.slow = _Smoother(2 / (slow + 1))
+        self.signal = _Smoother(2 / (signal + 1))
+        self.value = None
+
+    def update(self, price):
+        """
+        Add a bar\n
+
+        :param price: latest price\n
+        :return: tuple of macd line, signal line and histogram, or None before the first price
+        """
+        fast, slow = self.fast.update(price), self.slow.update(price)
+        if fast is None:
+            return self.value
+        line = fast - slow
+        signal_line = self.signal.update(line)
+        self.value = (line, signal_line, line - signal_line)
+        return self.value
+
+
+class BollingerBands:
+    __slots__ = ("window", "width", "sum", "squares", "value")
+
+    def __init__(self, window=20, width=2.0):
+        """
+        Streaming Bollinger bands (population standard deviation)\n
+
+        :param window: window in bars\n
+        :param width: band width in standard deviations
+        """
+        self.window = window
+        self.width = width
+        self.sum = _RollingSum(window)
+        self.squares = _RollingSum(window)
+        self.value = None
+
+    def update(self, price):
+        """
+        Add a bar\n
+
+        :param price: latest price\n
+        :return: tuple of middle, upper and lower bands, or None during warm-up
+        """
+        total = self.sum.update(price)
+        squares = self.squares.update(price * price)
+        if total is None:
+            self.value = None
+            return None
+
+        middle = total / self.window
+        deviation = math.sqrt(max(squares / self.window - middle * middle, 0.0))
+        self.value = (middle, middle + self.width * deviation, middle - self.width * deviation)
+        return self.value
+
+
+class ATR:
+    __slots__ = ("smoother", "previous", "value")
+
+    def __init__(self, window=14):
+        """
+        Streaming average true range with Wilder smoothing\n
+
+        :param window: window in bars
+        """
+        self.smoother = _Smoother(1 / window, window)
+        self.previous = None
+        self.value = None
+
+    def update(self, high, low, close):
+        """
+        Add a bar\n
+
+        :param high: bar high\n
+        :param low: bar low\n
+        :param close: bar close\n
+        :return: current ATR, or None during warm-up
+        """
+        ranges = [high - low]
+        if self.previous is not None:
+            ranges += [abs(high - self.previous), abs(low - self.previous)]
+        # A NaN only drops its own range, like np.fmax in batch mode
+        true_range = max((r for r in ranges if not math.isnan(r)), default=math.nan)
+        self.previous = close
+        self.value = self.smoother.update(true_range)
+        return self.value
@@ -0,0 +1,268 @@
+import asyncio
+import io
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+
+from lib.BatchFetcher import BatchFetcher
+
+# Payload kinds every provider serves, with the file extension used for fixtures
+KINDS = {
+    "quote": "html",
+    "summary": "html",
+    "statistics": "html",
+    "analysis": "html",
+    "income": "html",
+    "balance": "html",
+    "cashflow": "html",
+    "historical": "csv",
+}
+
+# Financial statement kinds -> Yahoo page
+STATEMENT_PAGES = {
+    "income": "financials",
+    "balance": "balance-sheet",
+    "cashflow": "cash-flow",
+}
+
+DAY = 86400
+
+HEADERS = {
+    "user-agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Mobile Safari/537.36"
+}
+
+
+class FixtureNotFound(LookupError):
+    pass
+
+
+def not_found(error):
+    """
+    Tell whether an error raised while fetching a payload means the ticker does not exist\n
+
+    :param error: exception from a provider or scraper fetch\n
+    :return: True for a missing fixture or an HTTP 404 from Yahoo
+    """
+    if isinstance(error, FixtureNotFound):
+        return True
+    # requests.HTTPError and httpx.HTTPStatusError both carry the response
+    return getattr(getattr(error, "response", None), "status_code", None) == 404
+
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp - timestamp % DAY, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _csv_rows(payload):
+    # Header and non-blank rows of a CSV payload, without line endings
+    header, *rows = payload.splitlines()
+    return header.strip(), [r.strip() for r in rows if r.strip()]
+
+
+def _csv(header, rows):
+    # Every line newline-terminated, so merged or sliced rows never run together
+    return b"".join(line + b"\n" for line in [header, *rows])
+
+
+class MarketDataProvider:
+    """
+    Source of the raw payloads YahooScraper parses\n
+
+    A payload is the page html for "quote", "summary", "statistics",
+    "analysis" and the "income", "balance" and "cashflow" statements, and Yahoo-format CSV for "historical" (period1, period2 and
+    interval keyword arguments). Subclasses implement fetch.
+    """
+    # Providers whose payloads live at an http link (see link), so async code can use its own client
+    remote = False
+    # fetch does i/o and should run off the event loop
+    blocking = True
+
+    def fetch(self, kind, ticker, **params):
+        """
+        Get one payload\n
+
+        :param kind: payload kind, a key of KINDS\n
+        :param ticker: stock ticker\n
+        :kwarg period1, period2, interval: range of "historical" payloads\n
+        :return: payload as bytes
+        """
+        raise NotImplementedError
+
+    def open(self, kind, ticker, **params):
+        """
+        Get one payload as a binary file-like object, for streaming parsers
+        """
+        return io.BytesIO(self.fetch(kind, ticker, **params))
+
+    async def afetch(self, kind, ticker, **params):
+        """
+        Async version of fetch
+        """
+        if self.blocking:
+            return await asyncio.to_thread(self.fetch, kind, ticker, **params)
+        return self.fetch(kind, ticker, **params)
+
+
+class YahooProvider(MarketDataProvider):
+    remote = True
+
+    def __init__(self, fetcher=None, **kwargs):
+        """
+        Live payloads from Yahoo Finance\n
+
+        :param fetcher: BatchFetcher to send requests through (default: new BatchFetcher with kwargs)
+        """
+        kwargs.setdefault("headers", HEADERS)
+        self.fetcher = fetcher or BatchFetcher(**kwargs)
+
+    def link(self, kind, ticker, **params):
+        """
+        :return: str url of a payload
+        """
+        if kind in ("quote", "summary"):
+            return f"https://finance.yahoo.com/quote/{ticker}?p={ticker}"
+        if kind == "statistics":
+            return f"https://finance.yahoo.com/quote/{ticker}/key-statistics?p={ticker}"
+        if kind == "analysis":
+            return f"https://finance.yahoo.com/quote/{ticker}/analysis?p={ticker}"
+        if kind in STATEMENT_PAGES:
+            return f"https://finance.yahoo.com/quote/{ticker}/{STATEMENT_PAGES[kind]}?p={ticker}"
+        if kind == "historical":
+            return (
+                f"https://query1.finance.yahoo.com/v7/finance/download/{ticker}"
+                f"?period1={params['period1']}&period2={params['period2']}&interval=1{params['interval']}"
+                )
+        raise ValueError(f"Unknown payload kind {kind!r}")
+
+    def fetch(self, kind, ticker, **params):
+        return self.fetcher.get(self.link(kind, ticker, **params)).content
+
+    def open(self, kind, ticker, **params):
+        # Stream the body instead of holding the whole download in memory
+        response = self.fetcher.get(self.link(kind, ticker, **params), stream=True)
+        response.raw.decode_content = True
+        return response.raw
+
+
+class ReplayProvider(MarketDataProvider):
+    blocking = False
+
+    def __init__(self, root, **kwargs):
+        """
+        Serve recorded payloads from a fixture directory, without any network access\n
+
+        Fixtures are laid out as <root>/<kind>/<TICKER>.html and
+        <root>/historical/<TICKER>_1<interval>.csv, as written by
+        RecordingProvider. Each file is read once and then served from memory;
+        historical requests return the recorded rows inside the requested range.\n
+
+        :param root: fixture directory\n
+        :kwarg preload: read every fixture up front (default: False)
+        """
+        self.root = Path(root)
+        self.payloads = {}
+        self.histories = {}
+        self.lock = threading.Lock()
+        if kwargs.get("preload", False):
+            self.preload()
+
+    def path(self, kind, ticker, **params):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown payload kind {kind!r}")
+        name = ticker.upper()
+        if kind == "historical":
+            name = f"{name}_1{params.get('interval', 'd')}"
+        return self.root / kind / f"{name}.{KINDS[kind]}"
+
+    def preload(self):
+        """
+        Read every fixture into memory
+        """
+        for kind, extension in KINDS.items():
+            for path in (self.root / kind).glob(f"*.{extension}"):
+                self._read(path)
+
+    def _read(self, path):
+        payload = self.payloads.get(path)
+        if payload is None:
+            with self.lock:
+                payload = self.payloads.get(path)
+                if payload is None:
+                    if not path.exists():
+                        raise FixtureNotFound(f"No recorded payload at {path}")
+                    payload = self.payloads[path] = path.read_bytes()
+        return payload
+
+    def fetch(self, kind, ticker, **params):
+        path = self.path(kind, ticker, **params)
+        payload = self._read(path)
+        if kind != "historical" or "period1" not in params:
+            return payload
+        return self._slice(path, payload, params["period1"], params["period2"])
+
+    def _slice(self, path, payload, period1, period2):
+        history = self.histories.get(path)
+        if history is None:
+            header, rows = _csv_rows(payload)
+            rows = sorted(rows)
+            history = self.histories[path] = (header, rows, [r[:10].decode() for r in rows])
+
+        # Rows are keyed by date, so the range is a contiguous slice
+        header, rows, dates = history
+        start = bisect_left(dates, _day(period1))
+        end = bisect_right(dates, _day(period2 - 1))
+        return _csv(header, rows[start:end])
+
+
+class RecordingProvider(MarketDataProvider):
+    def __init__(self, provider, root):
+        """
+        Pass requests through to another provider and save every payload as a replay fixture\n
+
+        Historical rows are merged into the existing fixture, so recording
+        several ranges builds up one history per ticker and interval.\n
+
+        :param provider: MarketDataProvider to record\n
+        :param root: fixture directory
+        """
+        self.provider = provider
+        self.replay = ReplayProvider(root)
+        self.lock = threading.Lock()
+
+    def fetch(self, kind, ticker, **params):
+        payload = self.provider.fetch(kind, ticker, **params)
+        self.save(kind, ticker, payload, **params)
+        return payload
+
+    def save(self, kind, ticker, payload, **params):
+        """
+        Write a payload to the fixture directory
+        """
+        path = self.replay.path(kind, ticker, **params)
+        with self.lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if kind == "historical" and path.exists():
+                header, old = _csv_rows(path.read_bytes())
+                header, new = _csv_rows(payload)
+                # Rows start with their date; a newer recording of a day replaces the older one
+                rows = {r[:10]: r for r in old + new}
+                payload = _csv(header, [rows[d] for d in sorted(rows)])
+            path.write_bytes(payload)
+
+
+def make_provider(name, fixtures=None):
+    """
+    Build a provider from a setting value\n
+
+    :param name: "yahoo", "replay" or "record"\n
+    :param fixtures: fixture directory for "replay" and "record"\n
+    :return: MarketDataProvider
+    """
+    if name == "yahoo":
+        return YahooProvider()
+    if name == "replay":
+        return ReplayProvider(fixtures)
+    if name == "record":
+        return RecordingProvider(YahooProvider(), fixtures)
+    raise ValueError(f"Unknown market data provider {name!r}")
@@ -0,0 +1,193 @@
+"""
+In-process counters and histograms exported in the Prometheus text format\n
+
+Metrics live in a Registry (the module-level registry by default) and are
+keyed by label values. Each process keeps its own numbers; with several
+gunicorn workers every scrape of /metrics reads the worker that served it.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds, from a fast cache hit to a slow page download
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        """
+        Monotonically increasing count\n
+
+        :param name: metric name\n
+        :param help: one line description\n
+        :param labels: label names
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(str(labels.get(n, "")) for n in self.labels), 0)
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, _labels(self.labels, key), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Distribution of observations in cumulative buckets\n
+
+        :param name: metric name\n
+        :param help: one line description\n
+        :param labels: label names\n
+        :param buckets: upper bounds of the buckets, ascending
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the seconds spent inside a with block
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self.values.get(tuple(str(labels.get(n, "")) for n in self.labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(b), s, c)) for key, (b, s, c) in self.values.items())
+        for key, (buckets, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                yield f"{self.name}_bucket", _labels(self.labels + ("le",), key + (_number(bound),)), cumulative
+            yield f"{self.name}_sum", _labels(self.labels, key), total
+            yield f"{self.name}_count", _labels(self.labels, key), count
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help, func):
+        """
+        Value read from a callable whenever metrics are rendered\n
+
+        :param name: metric name\n
+        :param help: one line description\n
+        :param func: callable returning a number
+        """
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def samples(self):
+        yield self.name, "", self.func()
+
+
+class Registry:
+    def __init__(self):
+        """
+        Named collection of metrics
+        """
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        """
+        Get or create a Counter
+        """
+        return self._register(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Get or create a Histogram
+        """
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def gauge(self, name, help, func):
+        """
+        Register a Gauge read from func (replacing an earlier one of the same name)
+        """
+        with self.lock:
+            metric = self.metrics[name] = Gauge(name, help, func)
+            return metric
+
+    def render(self):
+        """
+        :return: every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, labels, value in metric.samples():
+                lines.append(f"{sample}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right, insort
+
+INFINITY = float("inf")
+
+
+def _highest_first(entries):
+    # Ladders pop in ascending level order; keep time priority within a level
+    return sorted(entries, key=lambda entry: (-entry[0], entry[1]))
+
+
+class _Side:
+    def __init__(self):
+        """
+        Price-sorted resting orders that trigger when the price crosses their level\n
+
+        Entries are (level, sequence, order id) so orders at one level keep time priority.
+        """
+        self.entries = []
+
+    def add(self, level, seq, order_id):
+        insort(self.entries, (level, seq, order_id))
+
+    def remove(self, level, seq, order_id):
+        i = bisect_left(self.entries, (level, seq, order_id))
+        if i < len(self.entries) and self.entries[i][2] == order_id:
+            del self.entries[i]
+
+    def pop_at_or_below(self, price):
+        # Orders with level <= price form a prefix
+        end = bisect_right(self.entries, (price, INFINITY))
+        triggered = self.entries[:end]
+        del self.entries[:end]
+        return triggered
+
+    def pop_at_or_above(self, price):
+        # Orders with level >= price form a suffix
+        start = bisect_left(self.entries, (price, -INFINITY))
+        triggered = self.entries[start:]
+        del self.entries[start:]
+        return triggered
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class _Book:
+    def __init__(self):
+        """
+        The four trigger ladders of one ticker
+        """
+        self.buy_limits = _Side()  # fill when price <= limit
+        self.sell_limits = _Side() # fill when price >= limit
+        self.buy_stops = _Side()   # trigger when price >= stop
+        self.sell_stops = _Side()  # trigger when price <= stop
+
+
+class OrderBook:
+    def __init__(self):
+        """
+        In-memory index of resting limit, stop and stop-limit orders\n
+
+        Each ticker keeps its orders in price-sorted ladders, so a price tick
+        finds every order it crosses with a binary search and pops them as one
+        contiguous slice: O(log n + k) for k triggered orders.
+        """
+        self.books = {}
+        self.orders = {}
+        self.seq = 0
+
+    def __contains__(self, order_id):
+        return order_id in self.orders
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order_id, ticker, side, kind, **kwargs):
+        """
+        Rest an order in the book\n
+
+        :param order_id: unique order id\n
+        :param ticker: stock ticker\n
+        :param side: "buy" or "sell"\n
+        :param kind: "limit", "stop" or "stop_limit"\n
+        :kwarg limit: limit price (limit and stop_limit orders)\n
+        :kwarg stop: stop price (stop and stop_limit orders)\n
+        :kwarg triggered: stop_limit order whose stop has already been hit (default: False)
+        """
+        if order_id in self.orders:
+            self.remove(order_id)
+
+        limit = kwargs.get("limit")
+        stop = kwargs.get("stop")
+        if kind == "stop_limit" and kwargs.get("triggered"):
+            kind = "limit"
+        if kind in ("limit", "stop_limit") and limit is None:
+            raise ValueError(f"{kind} order needs a limit price")
+        if kind in ("stop", "stop_limit") and stop is None:
+            raise ValueError(f"{kind} order needs a stop price")
+
+        book = self.books.setdefault(ticker, _Book())
+        self.seq += 1
+        if kind == "limit":
+            ladder, level = (book.buy_limits if side == "buy" else book.sell_limits), limit
+        elif kind in ("stop", "stop_limit"):
+            ladder, level = (book.buy_stops if side == "buy" else book.sell_stops), stop
+        else:
+            raise ValueError(f"Unknown order kind {kind!r}")
+
+        ladder.add(level, self.seq, order_id)
+        self.orders[order_id] = {
+            "ticker": ticker, "side": side, "kind": kind, "limit": limit,
+            "ladder": ladder, "level": level, "seq": self.seq,
+        }
+
+    def remove(self, order_id):
+        """
+        Take an order out of the book (e.g. when it is cancelled)\n
+
+        :param order_id: order id
+        """
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            order["ladder"].remove(order["level"], order["seq"], order_id)
+
+    def on_price(self, ticker, price):
+        """
+        Apply a price tick\n
+
+        Orders come out in price-time priority: the best limit (highest buy,
+        lowest sell) and the first stop hit (lowest buy, highest sell) first,
+        and the oldest order first within a level.\n
+
+        :param ticker: stock ticker\n
+        :param price: latest price\n
+        :return: tuple of order ids to fill and ids of stop_limit orders that became limit orders
+        """
+        book = self.books.get(ticker)
+        if book is None:
+            return [], []
+
+        fills = []
+        activated = []
+        for level, seq, order_id in book.buy_stops.pop_at_or_below(price) + _highest_first(book.sell_stops.pop_at_or_above(price)):
+            order = self.orders[order_id]
+            if order["kind"] == "stop":
+                fills.append(order_id)
+                del self.orders[order_id]
+            else:
+                # A triggered stop_limit rests as a plain limit order
+                activated.append(order_id)
+                ladder = book.buy_limits if order["side"] == "buy" else book.sell_limits
+                ladder.add(order["limit"], seq, order_id)
+                order.update(kind="limit", ladder=ladder, level=order["limit"])
+
+        for level, seq, order_id in _highest_first(book.buy_limits.pop_at_or_above(price)) + book.sell_limits.pop_at_or_below(price):
+            fills.append(order_id)
+            del self.orders[order_id]
+
+        return fills, activated
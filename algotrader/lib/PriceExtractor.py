@@ -0,0 +1,123 @@
+import re
+
+from lib.Metrics import registry
+
+EXTRACTIONS = registry.counter(
+    "price_extraction_total", "Quote pages parsed, by the strategy that found the price ('none': every strategy failed)", ("strategy",)
+    )
+
+# Live price element of current quote pages, e.g.
+# <fin-streamer data-symbol="AAPL" data-field="regularMarketPrice" value="150.04">150.04</fin-streamer>
+FIN_STREAMER = re.compile(rb"<fin-streamer\b([^>]*)>([^<]*)<")
+ATTRIBUTE = re.compile(rb'([\w-]+)="([^"]*)"')
+
+# Quote data the page embeds for its own ticker
+QUOTE_STORE = b'"QuoteSummaryStore":{'
+EMBEDDED_PRICE = re.compile(rb'"regularMarketPrice":\{"raw":([-+0-9.eE]+)')
+
+# Price span of the quote header before Yahoo moved to fin-streamer elements
+LEGACY_SELECTOR = "#quote-header-info > div.My\\(6px\\).Pos\\(r\\).smartphone_Mt\\(6px\\) > div.D\\(ib\\).Va\\(m\\).Maw\\(65\\%\\).Ov\\(h\\) > div > span.Trsdu\\(0\\.3s\\).Fw\\(b\\).Fz\\(36px\\).Mb\\(-4px\\).D\\(ib\\)"
+
+
+class PriceNotFound(ValueError):
+    pass
+
+
+def _number(text):
+    try:
+        price = float((text.decode() if isinstance(text, bytes) else text).replace(",", ""))
+    except ValueError:
+        return None
+    return price if price > 0 else None
+
+
+def fin_streamer(content, ticker=None):
+    """
+    Read the regularMarketPrice fin-streamer element with a regex, without building a tree
+    """
+    for match in FIN_STREAMER.finditer(content):
+        attributes = dict(ATTRIBUTE.findall(match.group(1)))
+        if attributes.get(b"data-field") != b"regularMarketPrice":
+            continue
+        # Pages also stream index and related quotes, skip those
+        if ticker is not None and attributes.get(b"data-symbol", b"").upper() != ticker.upper().encode():
+            continue
+        price = _number(attributes.get(b"value") or match.group(2))
+        if price is not None:
+            return price
+    return None
+
+
+def embedded_json(content, ticker=None):
+    """
+    Read regularMarketPrice from the quote data embedded in the page's script
+    """
+    start = content.find(QUOTE_STORE)
+    if start < 0:
+        return None
+    match = EMBEDDED_PRICE.search(content, start)
+    return _number(match.group(1)) if match else None
+
+
+def legacy_css(content, ticker=None):
+    """
+    Select the quote header price span, as the scraper originally did
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # Only build a tree for the quote header instead of the whole page
+    soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer(id="quote-header-info"))
+    spans = soup.select(LEGACY_SELECTOR)
+    return _number(spans[0].getText()) if spans else None
+
+
+# Tried in order: targeted regex scans first, the full html parse last
+STRATEGIES = {
+    "fin_streamer": fin_streamer,
+    "embedded_json": embedded_json,
+    "legacy_css": legacy_css,
+}
+
+
+class PriceExtractor:
+    def __init__(self, **kwargs):
+        """
+        Find the price in a Yahoo Finance quote page with a chain of strategies\n
+
+        Each strategy returns None when its markup is missing, so a page layout
+        change falls through to the next one instead of failing. The strategy
+        that found each price is counted in the price_extraction_total metric.\n
+
+        :kwarg strategies: names from STRATEGIES in the order to try them (default: all, in STRATEGIES order)
+        """
+        names = kwargs.get("strategies", list(STRATEGIES))
+        self.strategies = [(name, STRATEGIES[name]) for name in names]
+
+    def extract(self, content, ticker=None):
+        """
+        Get the price out of a quote page\n
+
+        :param content: page html (bytes or str)\n
+        :param ticker: symbol the page is for, to skip prices of other symbols on it (default: None)\n
+        :raises PriceNotFound: if no strategy found a price\n
+        :return: float price of stock
+        """
+        return self.extract_with_strategy(content, ticker)[0]
+
+    def extract_with_strategy(self, content, ticker=None):
+        """
+        Same as extract\n
+
+        :return: tuple of float price and name of the strategy that found it
+        """
+        if isinstance(content, str):
+            content = content.encode()
+
+        for name, strategy in self.strategies:
+            price = strategy(content, ticker)
+            if price is not None:
+                EXTRACTIONS.inc(strategy=name)
+                return price, name
+
+        EXTRACTIONS.inc(strategy="none")
+        raise PriceNotFound(f"No price found in quote page{f' for {ticker}' if ticker else ''}")
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    def __init__(self):
+        """
+        A fetch currently running for some key, shared by every caller waiting on it
+        """
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # (loop, future) of async waiters, None once the fetch finished
+        self.waiters = []
+
+
+class QuoteCache:
+    def __init__(self, **kwargs):
+        """
+        Thread-safe TTL cache with LRU eviction and request coalescing\n
+
+        :kwarg ttl: seconds an entry stays fresh (default: 15)\n
+        :kwarg maxsize: maximum number of entries kept (default: 1024)
+        """
+        self.ttl = kwargs.get("ttl", 15)
+        self.maxsize = kwargs.get("maxsize", 1024)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.in_flight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, fetch):
+        """
+        Get a fresh value for key, calling fetch on a miss\n
+
+        Concurrent misses for the same key wait on a single call to fetch.\n
+
+        :param key: cache key (e.g. ticker)\n
+        :param fetch: callable returning the value for key\n
+        :return: cached or freshly fetched value
+        """
+        state, found = self._claim(key)
+        if state == "hit":
+            return found
+        if state == "wait":
+            found.event.wait()
+            return self._result(found)
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._finish(key, found, error=e)
+            raise
+        self._finish(key, found, value=value)
+        return value
+
+    async def aget(self, key, fetch):
+        """
+        Async version of get, for event loops\n
+
+        Counts and coalesces exactly like get, so async and threaded callers
+        share one fetch per key.\n
+
+        :param key: cache key (e.g. ticker)\n
+        :param fetch: coroutine function returning the value for key\n
+        :return: cached or freshly fetched value
+        """
+        state, found = self._claim(key)
+        if state == "hit":
+            return found
+        if state == "wait":
+            # The owner may be another thread or another event loop; it resolves this
+            # future through our loop, so waiting never holds an executor thread
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self.lock:
+                waiting = found.waiters is not None
+                if waiting:
+                    found.waiters.append((loop, future))
+            if waiting:
+                await future
+            return self._result(found)
+
+        try:
+            value = await fetch()
+        except BaseException as e:
+            self._finish(key, found, error=e)
+            raise
+        self._finish(key, found, value=value)
+        return value
+
+    def _claim(self, key):
+        # ("hit", value) when fresh, ("wait", pending) when another caller is already
+        # fetching key, ("fetch", pending) when this caller must fetch it
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return "hit", entry[0]
+
+            pending = self.in_flight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return "wait", pending
+
+            self.misses += 1
+            pending = self.in_flight[key] = _InFlight()
+            return "fetch", pending
+
+    def _finish(self, key, pending, value=None, error=None):
+        if error is None:
+            pending.value = value
+            self.set(key, value)
+        elif isinstance(error, Exception):
+            pending.error = error
+        else:
+            # Cancelled or interrupted owner: waiters get an ordinary error instead
+            pending.error = LookupError(f"Fetch of {key} was interrupted")
+        with self.lock:
+            del self.in_flight[key]
+            waiters, pending.waiters = pending.waiters, None
+        pending.event.set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, future)
+            except RuntimeError:
+                # The waiter's loop has closed, nobody is left to wake
+                pass
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+    @staticmethod
+    def _result(pending):
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def peek(self, key):
+        """
+        Get a fresh value for key without fetching or touching the counters\n
+
+        :param key: cache key\n
+        :return: cached value or None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+        return None
+
+    def set(self, key, value):
+        """
+        Store value for key, evicting the least recently used entries if full\n
+
+        :param key: cache key\n
+        :param value: value to store
+        """
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Drop key from the cache, or every entry if key is None\n
+
+        :param key: cache key
+        """
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def stats(self):
+        """
+        Get cache counters\n
+
+        :return: dict of hits, misses, coalesced waits, size and hit rate
+        """
+        with self.lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self.entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Process-wide cache shared by every YahooScraper instance
+quote_cache = QuoteCache(
+    ttl=float(os.environ.get("QUOTE_CACHE_TTL", 15)),
+    maxsize=int(os.environ.get("QUOTE_CACHE_SIZE", 1024))
+    )
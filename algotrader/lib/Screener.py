@@ -0,0 +1,352 @@
+import operator
+import re
+import threading
+from datetime import date as Date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Yahoo labels (lowercase, footnote numbers stripped) -> snapshot column
+ALIASES = {
+    "market cap": "market_cap",
+    "market cap (intraday)": "market_cap",
+    "enterprise value": "enterprise_value",
+    "p/e": "pe",
+    "trailing p/e": "pe",
+    "pe ratio (ttm)": "pe",
+    "forward p/e": "forward_pe",
+    "peg ratio (5 yr expected)": "peg",
+    "price/sales (ttm)": "ps",
+    "price/book (mrq)": "pb",
+    "enterprise value/revenue": "ev_revenue",
+    "enterprise value/ebitda": "ev_ebitda",
+    "beta (5y monthly)": "beta",
+    "eps (ttm)": "eps",
+    "diluted eps (ttm)": "eps",
+    "eps growth": "eps_growth",
+    "quarterly earnings growth (yoy)": "eps_growth",
+    "quarterly revenue growth (yoy)": "revenue_growth",
+    "next 5 years (per annum) - growth estimates": "eps_growth_5y",
+    "profit margin": "profit_margin",
+    "operating margin (ttm)": "operating_margin",
+    "return on assets (ttm)": "roa",
+    "return on equity (ttm)": "roe",
+    "revenue (ttm)": "revenue",
+    "total cash (mrq)": "cash",
+    "total debt (mrq)": "debt",
+    "total debt/equity (mrq)": "debt_equity",
+    "current ratio (mrq)": "current_ratio",
+    "forward annual dividend yield": "dividend_yield",
+    "payout ratio": "payout_ratio",
+    "shares outstanding": "shares_outstanding",
+    "float": "float_shares",
+    "% held by insiders": "insiders",
+    "% held by institutions": "institutions",
+    "short % of float": "short_float",
+    "previous close": "previous_close",
+    "avg. volume": "avg_volume",
+    "volume": "volume",
+    "1y target est": "target_price",
+}
+
+# Values Yahoo shows for missing data
+MISSING = ["N/A", "n/a", "NaN", "-", "--", "", "∞", "-∞"]
+
+SCALES = {"": 1.0, "%": 0.01, "k": 1e3, "K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+NUMBER = r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([%kKMBT]?)$"
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+CONDITION = re.compile(r"^\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(.+?)\s*$")
+
+
+def column_name(label):
+    """
+    Snapshot column for a Yahoo label ("Trailing P/E" -> "pe")\n
+
+    :param label: Yahoo table label or column name\n
+    :return: str column name
+    """
+    label = re.sub(r"\s+\d+$", "", str(label).strip())
+    alias = ALIASES.get(label.lower())
+    if alias:
+        return alias
+    return re.sub(r"[^0-9a-z]+", "_", label.lower().replace("'", "")).strip("_")
+
+
+def parse_value(text):
+    """
+    Parse one Yahoo value ("2.5T", "15.3%", "1,234", "N/A")\n
+
+    :param text: value as shown on Yahoo\n
+    :return: float (percentages as fractions, NaN when missing)
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = str(text).strip().replace(",", "")
+    match = re.match(NUMBER, text)
+    if match is None:
+        return np.nan
+    return float(match.group(1)) * SCALES[match.group(2)]
+
+
+def normalize(column):
+    """
+    Parse a column of Yahoo values into numbers\n
+
+    :param column: series of str values\n
+    :return: float64 series, or the stripped strings when no value is numeric (dates, ranges)
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64")
+
+    text = column.astype("string").str.strip().str.replace(",", "", regex=False)
+    text = text.mask(text.isin(MISSING))
+    parts = text.str.extract(NUMBER)
+    numbers = pd.to_numeric(parts[0], errors="coerce").astype("float64")
+    if numbers.notna().any() or text.isna().all():
+        return numbers * parts[1].map(SCALES).fillna(1.0).astype("float64")
+    return text.astype(object)
+
+
+def normalize_frame(df):
+    """
+    Rename Yahoo labels to snapshot columns and parse every value\n
+
+    Labels that map to the same column (e.g. "Market Cap" on the summary page
+    and "Market Cap (intraday)" on the statistics page) keep the first
+    non-missing value.\n
+
+    :param df: wide dataframe of Yahoo strings, one row per ticker\n
+    :return: dataframe of typed columns indexed by ticker
+    """
+    columns = {}
+    for i, label in enumerate(df.columns):
+        name = column_name(label)
+        values = normalize(df.iloc[:, i])
+        columns[name] = values if name not in columns else columns[name].combine_first(values)
+
+    # Build on the original labels first, the columns are aligned on them
+    result = pd.DataFrame(columns, index=df.index)
+    result.index = pd.Index(df.index.astype(str).str.upper(), name="ticker")
+    return result
+
+
+def _parquet():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        pass
+    try:
+        import fastparquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class SnapshotStore:
+    def __init__(self, root):
+        """
+        Dated snapshots of normalized fundamentals, one file per day\n
+
+        Snapshots are parquet files when pyarrow or fastparquet is installed
+        and pickled dataframes otherwise; both keep the column dtypes. Loaded
+        snapshots stay in memory until their file changes.\n
+
+        :param root: snapshot directory (created if missing)
+        """
+        self.root = Path(root)
+        self.extension = "parquet" if _parquet() else "pkl"
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def path(self, day):
+        return self.root / f"{day}.{self.extension}"
+
+    def dates(self):
+        """
+        :return: sorted list of "YYYY-MM-DD" dates with a snapshot
+        """
+        if not self.root.exists():
+            return []
+        return sorted({p.stem for p in self.root.glob("*.parquet")} | {p.stem for p in self.root.glob("*.pkl")})
+
+    def save(self, df, day=None):
+        """
+        Write a snapshot\n
+
+        :param df: normalized dataframe indexed by ticker\n
+        :param day: snapshot date (default: today)\n
+        :return: path of the snapshot
+        """
+        day = str(day or Date.today())
+        path = self.path(day)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.extension == "parquet":
+            df.to_parquet(path)
+        else:
+            df.to_pickle(path)
+        return path
+
+    def load(self, day=None):
+        """
+        Read a snapshot\n
+
+        :param day: snapshot date (default: latest)\n
+        :return: dataframe indexed by ticker
+        """
+        dates = self.dates()
+        if not dates:
+            raise FileNotFoundError(f"No screener snapshots in {self.root}")
+        day = str(day or dates[-1])
+
+        path = next((p for p in (self.root / f"{day}.parquet", self.root / f"{day}.pkl") if p.exists()), None)
+        if path is None:
+            raise FileNotFoundError(f"No screener snapshot for {day}")
+
+        mtime = path.stat().st_mtime
+        with self.lock:
+            cached = self.loaded.get(path)
+            if cached is None or cached[0] != mtime:
+                df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_pickle(path)
+                cached = self.loaded[path] = (mtime, df)
+        return cached[1]
+
+
+class Screener:
+    def __init__(self, root, **kwargs):
+        """
+        Screen a ticker universe with filters over a stored fundamentals snapshot\n
+
+        refresh scrapes the universe once and saves a typed snapshot; screen
+        then runs as vectorized comparisons over its columns, so a query never
+        touches Yahoo.\n
+
+        :param root: snapshot directory\n
+        :kwarg scraper: YahooScraper used by refresh (default: None, snapshots only)\n
+        :kwarg pages: pages scraped per ticker, any of "statistics", "summary", "analysis" (default: statistics and summary)
+        """
+        self.store = SnapshotStore(root)
+        self.scraper = kwargs.get("scraper")
+        self.pages = kwargs.get("pages", ("statistics", "summary"))
+
+        # Tickers that failed during the last refresh, mapped to their exception
+        self.errors = {}
+
+    def build(self, tickers):
+        """
+        Scrape and normalize fundamentals\n
+
+        :param tickers: list of stock tickers\n
+        :return: dataframe of typed columns indexed by ticker
+        """
+        if self.scraper is None:
+            raise ValueError("Screener needs a scraper to build snapshots")
+
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        # Failures of this build only, reported per ticker in self.errors
+        self.errors = errors = {}
+        getters = {
+            "statistics": lambda stocks: self.scraper.get_statistics(stocks, errors=errors),
+            "summary": lambda stocks: self.scraper.get_summary(stocks, errors=errors),
+            "analysis": lambda stocks: self.scraper.get_analysis(stocks, timeframe="cy", errors=errors),
+        }
+
+        frames = []
+        for page in self.pages:
+            frame = getters[page](tickers)
+            if not frame.empty:
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(index=pd.Index([], name="ticker"))
+        df = normalize_frame(pd.concat(frames, axis=1))
+        return df.reindex([t for t in tickers if t in df.index])
+
+    def refresh(self, tickers, day=None):
+        """
+        Scrape a universe and save it as the snapshot of a day\n
+
+        :param tickers: list of stock tickers\n
+        :param day: snapshot date (default: today)\n
+        :return: the saved dataframe
+        """
+        df = self.build(tickers)
+        self.store.save(df, day)
+        return df
+
+    def load(self, day=None):
+        """
+        :param day: snapshot date (default: latest)\n
+        :return: snapshot dataframe indexed by ticker
+        """
+        return self.store.load(day)
+
+    def parse_condition(self, condition):
+        """
+        :param condition: "pe < 20" (labels and values in Yahoo form also work: "Trailing P/E < 20", "EPS growth > 10%") or (column, operator, value)\n
+        :return: (column, operator, float value)
+        """
+        if isinstance(condition, str):
+            match = CONDITION.match(condition)
+            if match is None:
+                raise ValueError(f"Condition {condition!r} must look like 'column < value'")
+            condition = match.groups()
+
+        column, op, value = condition
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}")
+        number = parse_value(value)
+        if np.isnan(number):
+            raise ValueError(f"Value {value!r} is not a number")
+        return column_name(column), op, number
+
+    def screen(self, *conditions, **kwargs):
+        """
+        Filter and rank the tickers of a snapshot\n
+
+        Conditions are combined with "and"; a string may join several with
+        " and ". Tickers missing a filtered value never match.\n
+
+        :param conditions: filters, see parse_condition\n
+        :kwarg rank: column (or list of columns) to sort by (default: None, snapshot order)\n
+        :kwarg ascending: sort order for rank (default: True)\n
+        :kwarg limit: maximum number of rows (default: None, all)\n
+        :kwarg columns: columns to return (default: all)\n
+        :kwarg day: snapshot date (default: latest)\n
+        :return: dataframe of matching tickers
+        """
+        df = self.load(kwargs.get("day"))
+
+        parsed = []
+        for condition in conditions:
+            if isinstance(condition, str):
+                parsed += [self.parse_condition(c) for c in re.split(r"\s+and\s+", condition, flags=re.I)]
+            else:
+                parsed.append(self.parse_condition(condition))
+
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, value in parsed:
+            if column not in df.columns:
+                raise KeyError(f"Snapshot has no column {column!r}")
+            values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+            mask &= OPERATORS[op](values, value) & ~np.isnan(values)
+        result = df[mask]
+
+        rank = kwargs.get("rank")
+        if rank:
+            ranks = [column_name(c) for c in ([rank] if isinstance(rank, str) else rank)]
+            result = result.sort_values(ranks, ascending=kwargs.get("ascending", True), na_position="last")
+        if kwargs.get("columns"):
+            result = result[[column_name(c) for c in kwargs["columns"]]]
+        if kwargs.get("limit"):
+            result = result.head(kwargs["limit"])
+        return result
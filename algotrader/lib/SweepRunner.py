@@ -0,0 +1,193 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from lib.Backtester import Backtester, STRATEGIES
+
+# Per-process state set up once by _init_worker
+_worker = {}
+
+# Checkpoint files hold every sweep in one fixed schema: the key of its context and
+# parameters, the parameters as JSON and the statistics from summarize
+STATISTICS = ["sharpe", "total_return", "cagr", "max_drawdown", "trades", "exposure", "bars_per_second"]
+CHECKPOINT_COLUMNS = ["key", "params", *STATISTICS]
+
+
+def _init_worker(name, shape, index, columns, options):
+    # Attach to the parent's price array instead of receiving a pickled copy
+    shm = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+    closes = pd.DataFrame(prices, index=pd.DatetimeIndex(index), columns=columns, copy=False)
+    _worker["shm"] = shm
+    _worker["backtester"] = Backtester(closes, **options)
+
+
+def _run_chunk(strategy, chunk):
+    backtester = _worker["backtester"]
+    return [(params, summarize(backtester.run(strategy, **params))) for params in chunk]
+
+
+def summarize(result):
+    """
+    Reduce a BacktestResult over a universe to a single row of statistics\n
+
+    :param result: BacktestResult\n
+    :return: dict of aggregate statistics
+    """
+    stats = result.stats
+    return {
+        "sharpe": stats["sharpe"].mean(),
+        "total_return": stats["total_return"].mean(),
+        "cagr": stats["cagr"].mean(),
+        "max_drawdown": stats["max_drawdown"].min(),
+        "trades": int(stats["trades"].sum()),
+        "exposure": stats["exposure"].mean(),
+        "bars_per_second": result.bars_per_second,
+    }
+
+
+def param_key(params, context=None):
+    # context (strategy, universe, period, options) keeps checkpoints of different sweeps apart
+    return json.dumps({**(context or {}), "params": params}, sort_keys=True, default=str)
+
+
+class SweepRunner:
+    def __init__(self, closes, **kwargs):
+        """
+        Run a strategy over a parameter grid in parallel across CPU cores\n
+
+        The close prices are copied once into shared memory, and every worker
+        process maps them without pickling or reloading the history.\n
+
+        :param closes: dataframe of close prices with a DatetimeIndex, one column per ticker\n
+        :kwarg workers: number of worker processes (default: number of CPUs)\n
+        :kwarg checkpoint: csv file results are appended to, so an interrupted sweep can resume (default: None)\n
+        :kwarg metric: column used to rank results (default: "sharpe")\n
+        :kwarg cash, commission, interval: passed on to Backtester
+        """
+        self.closes = closes.sort_index().astype("float64")
+        self.workers = kwargs.get("workers") or os.cpu_count() or 1
+        self.checkpoint = kwargs.get("checkpoint")
+        self.metric = kwargs.get("metric", "sharpe")
+        self.options = {k: kwargs[k] for k in ("cash", "commission", "interval") if k in kwargs}
+
+    def combinations(self, grid):
+        """
+        Expand a parameter grid\n
+
+        :param grid: dict of parameter name to list of values\n
+        :return: list of parameter dicts
+        """
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+    def context(self, strategy):
+        """
+        Everything besides the parameters that a result depends on\n
+
+        :param strategy: strategy function\n
+        :return: dict of strategy name, tickers, period and Backtester options
+        """
+        return {
+            "strategy": strategy.__name__,
+            "tickers": list(self.closes.columns),
+            "period": [str(self.closes.index[0]), str(self.closes.index[-1])] if len(self.closes) else [],
+            "bars": len(self.closes),
+            **self.options,
+        }
+
+    def completed(self, keys=None):
+        """
+        Read the rows already written to the checkpoint\n
+
+        :param keys: keys (see param_key) of the rows to read (default: None, all)\n
+        :raises ValueError: if the checkpoint file does not have the checkpoint columns\n
+        :return: dataframe of parameters, statistics and key of finished combinations (empty without a checkpoint)
+        """
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return pd.DataFrame()
+        columns = list(pd.read_csv(self.checkpoint, nrows=0).columns)
+        if columns != CHECKPOINT_COLUMNS:
+            raise ValueError(f"{self.checkpoint} is not a sweep checkpoint, its columns are {columns}")
+
+        rows = pd.read_csv(self.checkpoint)
+        if keys is not None:
+            rows = rows[rows["key"].isin(keys)]
+        rows = rows.drop_duplicates("key", ignore_index=True)
+        if rows.empty:
+            return pd.DataFrame()
+        params = pd.DataFrame([json.loads(p) for p in rows["params"]], index=rows.index)
+        return pd.concat([params, rows[STATISTICS], rows[["key"]]], axis=1)
+
+    def run(self, strategy, grid):
+        """
+        Run every combination in grid that is not already in the checkpoint\n
+
+        Checkpoint rows only count when they were run with the same strategy,
+        tickers, period and options; rows of other sweeps are left out.\n
+
+        :param strategy: module-level strategy function or a name in STRATEGIES\n
+        :param grid: dict of parameter name to list of values\n
+        :return: dataframe of parameters and statistics, best first
+        """
+        if isinstance(strategy, str):
+            strategy = STRATEGIES[strategy]
+
+        context = self.context(strategy)
+        keys = {param_key(params, context): params for params in self.combinations(grid)}
+        done = self.completed(keys)
+        finished = set(done["key"]) if "key" in done else set()
+        todo = [params for key, params in keys.items() if key not in finished]
+
+        start = time.perf_counter()
+        rows = self._run_pool(strategy, todo, context) if todo else []
+        self.elapsed = time.perf_counter() - start
+
+        results = pd.concat([done, pd.DataFrame(rows)], ignore_index=True) if rows else done
+        if results.empty:
+            return results
+        return results.sort_values(self.metric, ascending=False, ignore_index=True)
+
+    def _run_pool(self, strategy, todo, context):
+        prices = np.ascontiguousarray(self.closes.to_numpy())
+        shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+        try:
+            np.ndarray(prices.shape, dtype="float64", buffer=shm.buf)[:] = prices
+            init_args = (
+                shm.name,
+                prices.shape,
+                self.closes.index.to_numpy(),
+                list(self.closes.columns),
+                self.options,
+            )
+
+            # Several chunks per worker keeps cores busy when runs take uneven time
+            size = max(1, len(todo) // (self.workers * 4))
+            chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+
+            rows = []
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=init_args) as pool:
+                futures = [pool.submit(_run_chunk, strategy, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    records = []
+                    for params, stats in future.result():
+                        key = param_key(params, context)
+                        rows.append({**params, **stats, "key": key})
+                        records.append({"key": key, "params": json.dumps(params, default=str), **stats})
+                    self._save(records)
+            return rows
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _save(self, records):
+        if not self.checkpoint or not records:
+            return
+        header = not os.path.exists(self.checkpoint)
+        pd.DataFrame(records, columns=CHECKPOINT_COLUMNS).to_csv(self.checkpoint, mode="a", header=header, index=False)
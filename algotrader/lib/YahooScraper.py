@@ -1,16 +1,90 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import io
+import re
 from datetime import datetime
+from lib.BatchFetcher import BatchFetcher
+from lib.MarketDataProvider import HEADERS, STATEMENT_PAGES, YahooProvider
+from lib.Metrics import registry
+from lib.PriceExtractor import PriceExtractor
+from lib.QuoteCache import quote_cache
+
+# pandas, numpy and bs4 are imported inside the methods that use them, so importing
+# this module is cheap and price lookups never load pandas
+
+HISTORICAL_DTYPES = {
+    "Open": "float64",
+    "High": "float64",
+    "Low": "float64",
+    "Close": "float64",
+    "Adj Close": "float64",
+    "Volume": "float64", # nullable until "null" rows are dropped
+}
+
+# Statements only change once a quarter, so stored ones are reused for a month
+STATEMENT_MAX_AGE = 30 * 86400
+
+# Statement pages show amounts in thousands, except per-share values and rates
+UNSCALED_ITEMS = re.compile(r"\bEPS\b|per share|\brate\b", re.IGNORECASE)
+
+# fetch: waiting on the provider, tables: html table extraction, parse: turning payloads into typed data
+PHASES = registry.histogram("scraper_phase_seconds", "Seconds spent per scraper phase and payload kind", ("phase", "kind"))
+FAILURES = registry.counter("scraper_failures_total", "Tickers that failed in multi-ticker calls", ("kind",))
+
+
+def _period(text):
+    # "12/31/2020" -> "2020-12-31", "ttm" -> "TTM"
+    try:
+        return datetime.strptime(text, "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return text.upper()
+
 
 class YahooScraper:
-    def __init__(self):
+    def __init__(self, **kwargs):
         """
-        A web scraping tool to gather essential stock information from Yahoo Finance
+        A web scraping tool to gather essential stock information from Yahoo Finance\n
+
+        :kwarg workers: number of concurrent requests for multi-ticker methods (default: 8)\n
+        :kwarg rate: maximum requests per second to Yahoo (default: 10)\n
+        :kwarg quote_cache: QuoteCache for get_stock_price (default: process-wide cache)\n
+        :kwarg store: HistoricalStore to keep downloaded bars in (default: None, always download)\n
+        :kwarg parser: html table backend, "lxml" (single pass) or "bs4" (default: "lxml")\n
+        :kwarg provider: MarketDataProvider the pages and downloads come from (default: live Yahoo Finance)\n
+        :kwarg strategies: price extraction strategies to try, in order (default: all, see PriceExtractor)
+        """
+        self.headers = dict(HEADERS)
+        self.fetcher = BatchFetcher(
+            workers=kwargs.get("workers", 8),
+            rate=kwargs.get("rate", 10),
+            headers=self.headers
+            )
+        self.provider = kwargs.get("provider") or YahooProvider(self.fetcher)
+        self.quote_cache = kwargs.get("quote_cache", quote_cache)
+        self.store = kwargs.get("store")
+        self.parser = kwargs.get("parser", "lxml")
+        self.price_extractor = PriceExtractor(**{k: kwargs[k] for k in ("strategies",) if k in kwargs})
+
+    def batch(self, func, stocks, errors=None):
         """
-        self.headers = {
-            "user-agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Mobile Safari/537.36"
-        }
+        Run func for every stock concurrently, skipping tickers that fail\n
+
+        :param func: callable taking a ticker and returning a dataframe\n
+        :param stocks: list of stock tickers\n
+        :param errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
+        :return: dataframe of successful results in input order
+        """
+        import pandas as pd
+
+        results = self.fetcher.map(func, stocks)
+        failed = {r.key: r.error for r in results if not r.ok}
+        if failed:
+            FAILURES.inc(len(failed), kind=func.__name__)
+            if errors is not None:
+                errors.update(failed)
+
+        frames = [r.value for r in results if r.ok]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames)
 
     def get_tables(self, link):
         """
@@ -19,53 +93,116 @@ class YahooScraper:
         :param link: str link to page\n
         :return: list of dataframes containing scraped info
         """
-        html = requests.get(link, headers=self.headers)
-        print(html.status_code)
-        soup = BeautifulSoup(html.content, "html.parser")
+        html = self.fetcher.get(link)
+        with PHASES.time(phase="tables", kind="link"):
+            return self.parse_tables(html.content)
+
+    def fetch(self, kind, stock, **params):
+        """
+        Get one payload from the provider, timed as the "fetch" phase\n
+
+        :param kind: payload kind (see MarketDataProvider)\n
+        :param stock: stock ticker\n
+        :return: payload as bytes
+        """
+        with PHASES.time(phase="fetch", kind=kind):
+            return self.provider.fetch(kind, stock, **params)
+
+    def fetch_tables(self, kind, stock):
+        """
+        Get all tables in a page served by the provider\n
+
+        :param kind: page kind ("summary", "statistics", "analysis")\n
+        :param stock: stock ticker\n
+        :return: list of dataframes containing scraped info
+        """
+        content = self.fetch(kind, stock)
+        with PHASES.time(phase="tables", kind=kind):
+            return self.parse_tables(content)
+
+    def parse_tables(self, content):
+        """
+        Parse every table in a Yahoo Finance page\n
+
+        The lxml backend reads all tables in a single parse of the page. The
+        bs4 backend (also used when lxml is missing or fails) finds each table
+        with BeautifulSoup and reparses it with pandas.\n
+
+        :param content: page html (bytes or str)\n
+        :return: list of dataframes containing scraped info
+        """
+        if self.parser == "lxml":
+            try:
+                return self._parse_tables_lxml(content)
+            except ImportError:
+                self.parser = "bs4"
+            except Exception:
+                pass
+        return self._parse_tables_bs4(content)
+
+    def _parse_tables_lxml(self, content):
+        import pandas as pd
+
+        buffer = io.BytesIO(content) if isinstance(content, bytes) else io.StringIO(content)
+        try:
+            return pd.read_html(buffer, flavor="lxml", index_col=0)
+        except ValueError as e:
+            # pandas raises ValueError when a page has no tables at all
+            if "No tables found" in str(e):
+                return []
+            raise
+
+    def _parse_tables_bs4(self, content):
+        import pandas as pd
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer("table"))
         tables = soup.find_all("table")
         dfs = []
 
         for table in tables:
-            df = pd.read_html(str(table), index_col=0)[0]
+            df = pd.read_html(io.StringIO(str(table)), index_col=0)[0]
             dfs.append(df)
         
         return dfs
 
-    def get_summary(self, stocks):
+    def get_summary(self, stocks, **kwargs):
         """
         Scrape Yahoo Finance for summary data\n
         
         :param stocks: list of stock tickers\n
+        :kwarg errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
         :return: dataframe of resulting data
         """
-        summary = []
-        for stock in stocks:
-            link = f"https://finance.yahoo.com/quote/{stock}?p={stock}"
-            tables = self.get_tables(link)
+        import pandas as pd
+
+        def summary(stock):
+            tables = self.fetch_tables("summary", stock)
 
             table = pd.concat(tables).T
             table.index = [stock]
-            summary.append(table)
-        
-        return pd.concat(summary)
+            return table
+
+        return self.batch(summary, stocks, kwargs.get("errors"))
 
-    def get_statistics(self, stocks):
+    def get_statistics(self, stocks, **kwargs):
         """
         Scrape Yahoo Finance for stock statistics\n
         
         :param stocks: list of stock tickers\n
+        :kwarg errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
         :return: dataframe of resulting data
         """
-        statistics = []
-        for stock in stocks:
-            link = f"https://finance.yahoo.com/quote/{stock}/key-statistics?p={stock}"
-            dfs = self.get_tables(link)[1:]
+        import pandas as pd
+
+        def statistics(stock):
+            dfs = self.fetch_tables("statistics", stock)[1:]
 
             values = pd.concat(dfs).T
             values.rename(index={1: stock}, inplace=True)
-            statistics.append(values)
-        
-        return pd.concat(statistics)
+            return values
+
+        return self.batch(statistics, stocks, kwargs.get("errors"))
 
     def get_historical(self, stocks, **kwargs):
         """
@@ -76,44 +213,210 @@ class YahooScraper:
         :kwarg period2: maximum range of data (datetime object)\n
         :kwarg interval: interval of data (d: daily, wk: weekly, mo: monthly)\n
         :kwarg oneline: return dataframe as 1 row per stock\n
+        :kwarg tidy: return long dataframe with ticker, date, field and value columns\n
+        :kwarg errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
         :return: dataframe of resulting data
         """
         # Handle kwargs
+        period1, period2, interval = self.historical_range(**kwargs)
+        oneline = kwargs.get("oneline", False)
+        tidy = kwargs.get("tidy", False)
+
+        if not (oneline or tidy) and len(stocks) > 1:
+            raise Exception("Multi-line output only available for one stock at a time")
+
+        def historical(stock):
+            if self.store is None:
+                df = self.download_historical(stock, period1, period2, interval)
+            else:
+                # Only download the ranges the store does not hold yet
+                for start, end in self.store.missing(stock, interval, period1, period2):
+                    df = self.download_historical(stock, start, end, interval)
+                    self.store.save(stock, interval, df, start, end)
+                df = self.store.load(stock, interval, period1, period2)
+
+            if tidy:
+                return self.tidy_historical(stock, df)
+            elif oneline:
+                return self.flatten_historical(stock, df)
+            return df
+
+        if not (oneline or tidy):
+            return historical(stocks[0])
+
+        return self.batch(historical, stocks, kwargs.get("errors"))
+
+    def historical_range(self, **kwargs):
+        """
+        Resolve the period and interval keyword arguments of get_historical\n
+
+        :return: tuple of period1, period2 (unix timestamps) and interval
+        """
         today = datetime.today() - datetime(1970, 1, 1)
         today = round(today.total_seconds())
         period1 = kwargs.get("period1", today - 31536000) # Today - 1 year
         period2 = kwargs.get("period2", period1 + 31536000) # Min bound + 1 year
         interval = kwargs.get("interval", "d")
-        oneline = kwargs.get("oneline", False)
+        return period1, period2, interval
 
-        if not oneline and len(stocks) > 1:
-            raise Exception("Multi-line output only available for one stock at a time")
+    def download_historical(self, stock, period1, period2, interval):
+        """
+        Download historical data for one stock from the provider\n
 
-        historical = []
-        for stock in stocks:
-            link = f"https://query1.finance.yahoo.com/v7/finance/download/{stock}?period1={period1}&period2={period2}&interval=1{interval}"
-            data = requests.get(link, stream=True, headers=self.headers).text
-            data = data.split("\n")
-            data = [row.split(",") for row in data]
+        :param stock: stock ticker\n
+        :param period1: minimum range of data (unix timestamp)\n
+        :param period2: maximum range of data (unix timestamp)\n
+        :param interval: interval of data (d: daily, wk: weekly, mo: monthly)\n
+        :return: dataframe indexed by date
+        """
+        with PHASES.time(phase="fetch", kind="historical"):
+            buffer = self.provider.open("historical", stock, period1=period1, period2=period2, interval=interval)
+        # The body streams while it is parsed, so slow downloads show up in this phase
+        with PHASES.time(phase="parse", kind="historical"):
+            return self.parse_historical(buffer)
 
-            df = pd.DataFrame(data[1:], columns=data[0])
-            df = df.set_index("Date")
-            
-            if oneline:
-                indices = []
-                for index, row in df.iterrows():
-                    for col in df.columns:
-                        indices.append(f"{col} - {row.name}")
-                df = df.values.flatten()
-                historical.append(pd.DataFrame([df], index=[stock], columns=indices))
-            else:
+    def parse_historical(self, buffer):
+        """
+        Parse a Yahoo Finance historical CSV into typed columns\n
+
+        :param buffer: file-like object or path of CSV data\n
+        :return: dataframe of float64 prices and int64 volume with a DatetimeIndex
+        """
+        import pandas as pd
+
+        df = pd.read_csv(
+            buffer,
+            index_col="Date",
+            parse_dates=["Date"],
+            na_values=["null"],
+            dtype=HISTORICAL_DTYPES,
+            skip_blank_lines=True
+            )
+
+        # Yahoo emits "null" rows for days without trades (e.g. dividends on holidays)
+        df = df.dropna(how="all")
+        df["Volume"] = df["Volume"].fillna(0).astype("int64")
+        return df
+
+    def flatten_historical(self, stock, df):
+        """
+        Reshape historical data into a single row of "<field> - <date>" columns\n
+
+        :param stock: stock ticker used as the row label\n
+        :param df: dataframe of historical data indexed by date\n
+        :return: 1 row dataframe
+        """
+        import numpy as np
+        import pandas as pd
+
+        fields = df.columns.to_numpy(dtype=str)
+        dates = pd.DatetimeIndex(df.index).strftime("%Y-%m-%d").to_numpy(dtype=str)
+
+        # Row-major ravel matches labels repeating every field for each date
+        labels = np.char.add(np.tile(fields, len(dates)), np.repeat(np.char.add(" - ", dates), len(fields)))
+        values = df.to_numpy().ravel()
+        return pd.DataFrame(values[np.newaxis, :], index=[stock], columns=labels)
+
+    def tidy_historical(self, stock, df):
+        """
+        Reshape historical data into long (ticker, date, field, value) rows\n
+
+        :param stock: stock ticker\n
+        :param df: dataframe of historical data indexed by date\n
+        :return: long dataframe that concatenates cheaply across tickers
+        """
+        import numpy as np
+        import pandas as pd
+
+        n_dates, n_fields = df.shape
+        fields = pd.Categorical(np.tile(df.columns.to_numpy(), n_dates), categories=df.columns)
+        return pd.DataFrame({
+            "ticker": stock,
+            "date": np.repeat(df.index.to_numpy(), n_fields),
+            "field": fields,
+            "value": df.to_numpy(dtype="float64").ravel(),
+            })
+
+    def get_financials(self, stocks, **kwargs):
+        """
+        Scrape Yahoo Finance for financial statements\n
+
+        Statements are kept in the store (when one is set) and only downloaded
+        again once older than max_age.\n
+
+        :param stocks: list of stock tickers\n
+        :kwarg statement: "income", "balance", "cashflow" or "all" (default: "all")\n
+        :kwarg max_age: seconds a stored statement is reused for (default: 30 days)\n
+        :kwarg errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
+        :return: dataframe of float64 line items indexed by (ticker, period), with (statement, item) columns for "all"
+        """
+        import pandas as pd
+
+        statement = kwargs.get("statement", "all")
+        statements = list(STATEMENT_PAGES) if statement == "all" else [statement]
+        if any(s not in STATEMENT_PAGES for s in statements):
+            raise ValueError(f"Unknown statement {statement!r}")
+        max_age = kwargs.get("max_age", STATEMENT_MAX_AGE)
+
+        def financials(stock):
+            frames = {s: self.get_statement(stock, s, max_age) for s in statements}
+            df = frames[statement] if statement != "all" else pd.concat(frames, axis=1, sort=False)
+            df.index = pd.MultiIndex.from_product([[stock], df.index], names=["ticker", "period"])
+            return df
+
+        return self.batch(financials, stocks, kwargs.get("errors"))
+
+    def get_statement(self, stock, statement, max_age=STATEMENT_MAX_AGE):
+        """
+        Get one financial statement, from the store while it is fresh\n
+
+        :param stock: stock ticker\n
+        :param statement: "income", "balance" or "cashflow"\n
+        :param max_age: seconds a stored statement is reused for\n
+        :return: dataframe of float64 line items per period
+        """
+        if self.store is not None:
+            df = self.store.load_statement(stock, statement, max_age)
+            if df is not None:
                 return df
-        
-        return pd.concat(historical)
-                
 
-    def get_financials(self, stocks):
-        pass
+        content = self.fetch(statement, stock)
+        with PHASES.time(phase="parse", kind=statement):
+            df = self.parse_statement(content)
+        if self.store is not None:
+            self.store.save_statement(stock, statement, df)
+        return df
+
+    def parse_statement(self, content):
+        """
+        Parse a Yahoo Finance financial statement page\n
+
+        :param content: page html (bytes or str)\n
+        :return: dataframe of float64 line items (columns) per period (index), amounts in units instead of the page's thousands
+        """
+        import numpy as np
+        import pandas as pd
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        # Statements are grids of divs rather than tables: a header row of periods and a fin-row per line item
+        soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer("div", class_=["D(tbhg)", "D(tbrg)"]))
+        header = soup.select_one("div.D\\(tbhg\\) div.D\\(tbr\\)")
+        if header is None:
+            return pd.DataFrame(index=pd.Index([], name="period"), dtype="float64")
+        periods = [_period(cell.get_text(strip=True)) for cell in header.find_all("div", recursive=False)[1:]]
+
+        items, cells = [], []
+        for row in soup.select('div[data-test="fin-row"] > div.D\\(tbr\\)'):
+            label, *values = row.find_all("div", recursive=False)
+            items.append(label.get("title") or label.get_text(strip=True))
+            values = [v.get_text(strip=True) for v in values[:len(periods)]]
+            cells += values + [""] * (len(periods) - len(values))
+
+        text = pd.Series(cells, dtype="string").str.replace(",", "", regex=False)
+        numbers = pd.to_numeric(text, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        scale = [1.0 if UNSCALED_ITEMS.search(item) else 1000.0 for item in items]
+        numbers = numbers.reshape(len(items), len(periods)) * np.array(scale)[:, None]
+        return pd.DataFrame(numbers.T, index=pd.Index(periods, name="period"), columns=items)
 
     def get_analysis(self, stocks, **kwargs):
         """
@@ -121,8 +424,11 @@ class YahooScraper:
         
         :param stocks: list of stock tickers\n
         :kwarg timeframe: column to scrape ('cq': current quarter, 'nq': next quarter, 'cy': current year, 'ny': next year)\n
+        :kwarg errors: dict the failed tickers are added to, mapped to their exception (default: None)\n
         :return: dataframe of resulting data
         """
+        import pandas as pd
+
         # Handle timeframe keyword arguments
         timeframe = kwargs.get("timeframe", "cq")
         if timeframe =="nq":
@@ -134,11 +440,9 @@ class YahooScraper:
         else:
             col = 0
 
-        analysis = []
-        for stock in stocks:
+        def analysis(stock):
             dfs = []
-            link = f"https://finance.yahoo.com/quote/{stock}/analysis?p={stock}"
-            for table in self.get_tables(link):
+            for table in self.fetch_tables("analysis", stock):
                 # Get new index names (to differentiate)
                 title = table.index.name
                 indices = [f"{row} - {title}" for row in table.index]
@@ -149,25 +453,66 @@ class YahooScraper:
                 table.columns = [stock]
                 dfs.append(table)
             
-            analysis.append(pd.concat(dfs).T)
-            
-        return pd.concat(analysis)
+            return pd.concat(dfs).T
+
+        return self.batch(analysis, stocks, kwargs.get("errors"))
     
     def get_stock_price(self, ticker):
         """
         Scrapes Yahoo Finance for the price of some stock\n
+
+        Prices are served from the quote cache while fresh, so a burst of
+        lookups for one ticker makes a single upstream request per TTL.\n
         
         :param ticker: symbol of stock\n
         :return: float price of stock
         """
-        link = f"https://finance.yahoo.com/quote/{ticker}?p={ticker}"
-        overview = requests.get(link)
-        soup = BeautifulSoup(overview.content, "html.parser")
+        return self.quote_cache.get(ticker.upper(), lambda: self.fetch_stock_price(ticker))
+
+    def get_stock_prices(self, tickers, **kwargs):
+        """
+        Get the prices of many stocks in one batched, deduplicated lookup\n
 
-        css_selector = "#quote-header-info > div.My\(6px\).Pos\(r\).smartphone_Mt\(6px\) > div.D\(ib\).Va\(m\).Maw\(65\%\).Ov\(h\) > div > span.Trsdu\(0\.3s\).Fw\(b\).Fz\(36px\).Mb\(-4px\).D\(ib\)"
-        price = soup.select(css_selector)[0]
-        price = price.getText().replace(",", "")
-        return float(price)
+        :param tickers: list of stock tickers\n
+        :kwarg cached: serve fresh prices from the quote cache (default: True)\n
+        :return: tuple of dict of ticker to float price and dict of failed ticker to exception
+        """
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if kwargs.get("cached", True):
+            price = self.get_stock_price
+        else:
+            def price(ticker):
+                value = self.fetch_stock_price(ticker)
+                self.quote_cache.set(ticker, value)
+                return value
+
+        results = self.fetcher.map(price, tickers)
+        errors = {r.key: r.error for r in results if not r.ok}
+        if errors:
+            FAILURES.inc(len(errors), kind="quote")
+        return {r.key: r.value for r in results if r.ok}, errors
+
+    def fetch_stock_price(self, ticker):
+        """
+        Scrapes Yahoo Finance for the price of some stock, bypassing the quote cache\n
+
+        :param ticker: symbol of stock\n
+        :return: float price of stock
+        """
+        content = self.fetch("quote", ticker)
+        with PHASES.time(phase="parse", kind="quote"):
+            return self.parse_price(content, ticker)
+
+    def parse_price(self, content, ticker=None):
+        """
+        Parse the price out of a Yahoo Finance quote page\n
+
+        :param content: page html (bytes or str)\n
+        :param ticker: symbol the page is for (default: None)\n
+        :raises PriceNotFound: if the page holds no recognizable price\n
+        :return: float price of stock
+        """
+        return self.price_extractor.extract(content, ticker)
     
     def save(self, stocks, filename):
         """
@@ -178,5 +523,3 @@ class YahooScraper:
         """
         stocks.to_csv(filename)
 
-y = YahooScraper()
-print(y.get_historical(["AAPL"]))
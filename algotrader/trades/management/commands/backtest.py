@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.Backtester import Backtester, STRATEGIES
+from lib.HistoricalStore import HistoricalStore
+
+
+def parse_param(text):
+    """
+    Parse a name=value strategy parameter, converting numeric values
+    """
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise CommandError(f"Parameter {text!r} must look like name=value")
+    for cast in (int, float):
+        try:
+            return name, cast(value)
+        except ValueError:
+            pass
+    return name, value
+
+
+def timestamp(text):
+    return round(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+class Command(BaseCommand):
+    help = "Backtest a strategy over stored historical bars"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tickers", nargs="+")
+        parser.add_argument("--strategy", default="sma_crossover", choices=sorted(STRATEGIES))
+        parser.add_argument("--param", action="append", default=[], help="strategy parameter as name=value")
+        parser.add_argument("--start", default="2000-01-01", help="first date (YYYY-MM-DD)")
+        parser.add_argument("--end", default=datetime.now(timezone.utc).strftime("%Y-%m-%d"), help="last date (YYYY-MM-DD)")
+        parser.add_argument("--interval", default="d", choices=["d", "wk", "mo"])
+        parser.add_argument("--commission", type=float, default=0.001)
+        parser.add_argument("--fetch", action="store_true", help="download missing bars before running")
+
+    def handle(self, *args, **options):
+        tickers = [t.upper() for t in options["tickers"]]
+        period1, period2 = timestamp(options["start"]), timestamp(options["end"])
+        interval = options["interval"]
+        store = HistoricalStore(settings.HISTORICAL_STORE)
+
+        if options["fetch"]:
+            from trades.quotes import get_scraper
+            errors = {}
+            get_scraper().get_historical(tickers, period1=period1, period2=period2, interval=interval, tidy=True, errors=errors)
+            for ticker, error in errors.items():
+                self.stderr.write(f"{ticker}: {error}")
+
+        closes = store.load_many(tickers, interval, period1, period2)
+        closes = closes.dropna(axis=1, how="all")
+        if closes.empty:
+            raise CommandError("No stored bars for these tickers, run again with --fetch")
+
+        params = dict(parse_param(p) for p in options["param"])
+        backtester = Backtester(closes, commission=options["commission"], interval=interval)
+        result = backtester.run(options["strategy"], **params)
+
+        self.stdout.write(result.stats.to_string(float_format="{:.4f}".format))
+        self.stdout.write(f"{result.bars} bars in {result.elapsed * 1000:.1f} ms ({result.bars_per_second:,.0f} bars/s)")
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trades.models import Quote, WatchlistItem
+from trades.orders import OrderEngine
+from trades.quotes import get_scraper
+from users.models import Position
+
+
+def tracked_tickers(engine=None):
+    """
+    Get every ticker users currently hold, watch or have open orders in
+
+    :param engine: OrderEngine whose open orders to include
+    :return: sorted list of tickers
+    """
+    held = Position.objects.filter(quantity__gt=0).values_list("stock", flat=True).distinct()
+    tickers = set(held)
+    tickers.update(WatchlistItem.objects.values_list("ticker", flat=True).distinct())
+    if engine is not None:
+        tickers.update(engine.tickers())
+    return sorted(tickers)
+
+
+class Command(BaseCommand):
+    help = "Poll prices of held and watched tickers in batches, store them in the shared quote table and fill pending orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=settings.QUOTE_REFRESH_INTERVAL, help="seconds between polls")
+        parser.add_argument("--batch-size", type=int, default=50, help="tickers fetched per batch")
+        parser.add_argument("--once", action="store_true", help="poll once and exit")
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        batch_size = options["batch_size"]
+        self.engine = OrderEngine()
+
+        while True:
+            start = time.monotonic()
+            self.engine.sync()
+            self.refresh(tracked_tickers(self.engine), batch_size)
+            if options["once"]:
+                return
+
+            # Keep a steady cadence regardless of how long the poll took
+            time.sleep(max(interval - (time.monotonic() - start), 0))
+
+    def refresh(self, tickers, batch_size):
+        y = get_scraper()
+        stored = 0
+        for i in range(0, len(tickers), batch_size):
+            batch = tickers[i:i + batch_size]
+            prices, errors = y.get_stock_prices(batch, cached=False)
+            Quote.store(prices)
+            stored += len(prices)
+            for order in self.engine.process_prices(prices):
+                self.stdout.write(f"Filled {order}")
+            for ticker, error in errors.items():
+                self.stderr.write(f"{ticker}: {error}")
+
+        self.stdout.write(f"Refreshed {stored}/{len(tickers)} quotes")
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.Screener import Screener
+from trades.quotes import get_scraper
+
+
+class Command(BaseCommand):
+    help = "Snapshot fundamentals for a ticker universe and screen it with filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refresh", nargs="*", default=None, metavar="TICKER", help="scrape these tickers into today's snapshot")
+        parser.add_argument("--universe", default=None, help="file of tickers (one per line) to refresh")
+        parser.add_argument("--pages", default="statistics,summary", help="pages scraped on refresh")
+        parser.add_argument("--where", action="append", default=[], help="filter such as 'pe < 20' or 'eps_growth > 10%%'")
+        parser.add_argument("--rank", default=None, help="column to sort by")
+        parser.add_argument("--desc", action="store_true", help="sort descending")
+        parser.add_argument("--columns", default=None, help="comma separated columns to show")
+        parser.add_argument("--date", default=None, help="snapshot date (YYYY-MM-DD, default: latest)")
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        screener = Screener(settings.SCREENER_SNAPSHOTS, pages=tuple(options["pages"].split(",")))
+
+        tickers = list(options["refresh"] or [])
+        if options["universe"]:
+            with open(options["universe"]) as f:
+                tickers += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        if tickers or options["refresh"] is not None:
+            if not tickers:
+                raise CommandError("--refresh needs tickers or --universe")
+            screener.scraper = get_scraper()
+            start = time.perf_counter()
+            df = screener.refresh(tickers, options["date"])
+            self.stdout.write(f"Snapshot of {len(df)} tickers, {df.shape[1]} columns in {time.perf_counter() - start:.1f} s")
+            for ticker, error in screener.errors.items():
+                self.stderr.write(f"{ticker}: {error}")
+
+        columns = options["columns"].split(",") if options["columns"] else None
+        start = time.perf_counter()
+        try:
+            result = screener.screen(
+                *options["where"],
+                rank=options["rank"],
+                ascending=not options["desc"],
+                columns=columns,
+                limit=options["top"],
+                day=options["date"]
+                )
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            raise CommandError(e)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(result.to_string())
+        self.stdout.write(f"{len(result)} matches in {elapsed:.1f} ms")
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.Backtester import STRATEGIES
+from lib.HistoricalStore import HistoricalStore
+from lib.SweepRunner import SweepRunner
+from trades.management.commands.backtest import parse_param, timestamp
+
+
+class Command(BaseCommand):
+    help = "Run a strategy over a parameter grid in parallel and rank the results"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tickers", nargs="+")
+        parser.add_argument("--strategy", default="sma_crossover", choices=sorted(STRATEGIES))
+        parser.add_argument("--grid", action="append", default=[], help="parameter values as name=v1,v2,...")
+        parser.add_argument("--start", default="2000-01-01", help="first date (YYYY-MM-DD)")
+        parser.add_argument("--end", default=None, help="last date (YYYY-MM-DD, default: today)")
+        parser.add_argument("--interval", default="d", choices=["d", "wk", "mo"])
+        parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+        parser.add_argument("--checkpoint", default=None, help="csv file to append results to and resume from")
+        parser.add_argument("--metric", default="sharpe")
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        tickers = [t.upper() for t in options["tickers"]]
+        grid = {}
+        for text in options["grid"]:
+            name, sep, values = text.partition("=")
+            if not sep:
+                raise CommandError(f"Grid {text!r} must look like name=v1,v2,...")
+            grid[name] = [parse_param(f"{name}={v}")[1] for v in values.split(",")]
+
+        period1 = timestamp(options["start"])
+        period2 = timestamp(options["end"]) if options["end"] else 2 ** 31
+        closes = HistoricalStore(settings.HISTORICAL_STORE).load_many(tickers, options["interval"], period1, period2)
+        closes = closes.dropna(axis=1, how="all")
+        if closes.empty:
+            raise CommandError("No stored bars for these tickers, fetch them with 'backtest --fetch' first")
+
+        runner = SweepRunner(
+            closes,
+            workers=options["workers"],
+            checkpoint=options["checkpoint"],
+            metric=options["metric"],
+            interval=options["interval"]
+            )
+        results = runner.run(options["strategy"], grid)
+
+        self.stdout.write(results.drop(columns="key").head(options["top"]).to_string(float_format="{:.4f}".format))
+        self.stdout.write(f"{len(results)} combinations, {runner.elapsed:.2f} s with {runner.workers} workers")
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('ticker', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('price', models.FloatField()),
+                ('updated', models.DateTimeField(verbose_name='last updated')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trades', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.CharField(max_length=10)),
+                ('side', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('kind', models.CharField(choices=[('limit', 'Limit'), ('stop', 'Stop'), ('stop_limit', 'Stop limit')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('limit_price', models.FloatField(blank=True, null=True)),
+                ('stop_price', models.FloatField(blank=True, null=True)),
+                ('triggered', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('filled', 'Filled'), ('cancelled', 'Cancelled'), ('rejected', 'Rejected')], default='open', max_length=9)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('filled_at', models.DateTimeField(blank=True, null=True)),
+                ('fill_price', models.FloatField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'stock'], name='trades_orde_status_b958c8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['owner', 'status'], name='trades_orde_owner_i_ad882b_idx'),
+        ),
+    ]
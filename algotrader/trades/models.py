@@ -1,3 +1,190 @@
 from django.db import models
+from django.utils import timezone
+from datetime import timedelta
 
 # Create your models here.
+
+def clean_ticker(ticker):
+    """
+    Normalize a user-supplied ticker
+
+    :param ticker: stock ticker
+    :raises ValueError: if the ticker is malformed
+    :return: upper-case ticker
+    """
+    ticker = ticker.strip().upper()
+    if not ticker or len(ticker) > 10 or not all(c.isalnum() or c in ".-^=" for c in ticker):
+        raise ValueError(f"Invalid ticker {ticker!r}")
+    return ticker
+
+
+class Quote(models.Model):
+    ticker = models.CharField(max_length=10, primary_key=True)
+    price = models.FloatField()
+    updated = models.DateTimeField(verbose_name="last updated")
+
+    def __str__(self):
+        return f"{self.ticker} {self.price}"
+
+    @classmethod
+    def fresh(cls, tickers, max_age):
+        """
+        Get stored prices that are recent enough to use
+
+        :param tickers: list of stock tickers
+        :param max_age: maximum age in seconds
+        :return: dict of ticker to price
+        """
+        oldest = timezone.now() - timedelta(seconds=max_age)
+        quotes = cls.objects.filter(ticker__in=tickers, updated__gte=oldest)
+        return dict(quotes.values_list("ticker", "price"))
+
+    @classmethod
+    def store(cls, prices):
+        """
+        Insert or update stored prices
+
+        :param prices: dict of ticker to price
+        """
+        now = timezone.now()
+        quotes = [cls(ticker=t, price=p, updated=now) for t, p in prices.items()]
+        existing = set(cls.objects.filter(ticker__in=prices).values_list("ticker", flat=True))
+        cls.objects.bulk_update([q for q in quotes if q.ticker in existing], ["price", "updated"])
+        cls.objects.bulk_create([q for q in quotes if q.ticker not in existing], ignore_conflicts=True)
+
+class Order(models.Model):
+    SIDES = [("buy", "Buy"), ("sell", "Sell")]
+    KINDS = [("limit", "Limit"), ("stop", "Stop"), ("stop_limit", "Stop limit")]
+    STATUSES = [("open", "Open"), ("filled", "Filled"), ("cancelled", "Cancelled"), ("rejected", "Rejected")]
+
+    owner = models.ForeignKey("users.Trader", on_delete=models.CASCADE)
+    stock = models.CharField(max_length=10)
+    side = models.CharField(max_length=4, choices=SIDES)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    quantity = models.IntegerField()
+    limit_price = models.FloatField(blank=True, null=True)
+    stop_price = models.FloatField(blank=True, null=True)
+    triggered = models.BooleanField(default=False)
+    status = models.CharField(max_length=9, choices=STATUSES, default="open")
+    created = models.DateTimeField(auto_now_add=True)
+    filled_at = models.DateTimeField(blank=True, null=True)
+    fill_price = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "stock"]),
+            models.Index(fields=["owner", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.side} {self.quantity} {self.stock} {self.kind} ({self.status})"
+
+    @classmethod
+    def place(cls, owner, stock, side, kind, quantity, **kwargs):
+        """
+        Validate and store a pending order
+
+        :param owner: Trader placing the order
+        :param stock: stock ticker
+        :param side: "buy" or "sell"
+        :param kind: "limit", "stop" or "stop_limit"
+        :param quantity: number of shares
+        :kwarg limit_price: limit price (limit and stop_limit orders)
+        :kwarg stop_price: stop price (stop and stop_limit orders)
+        :raises ValueError: if the order is malformed
+        :return: Order object
+        """
+        if side not in dict(cls.SIDES):
+            raise ValueError(f"Unknown side {side!r}")
+        if kind not in dict(cls.KINDS):
+            raise ValueError(f"Unknown order type {kind!r}")
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+
+        limit_price = stop_price = None
+        if kind in ("limit", "stop_limit"):
+            limit_price = float(kwargs.get("limit_price") or 0)
+            if limit_price <= 0:
+                raise ValueError("A positive limit price is required")
+        if kind in ("stop", "stop_limit"):
+            stop_price = float(kwargs.get("stop_price") or 0)
+            if stop_price <= 0:
+                raise ValueError("A positive stop price is required")
+
+        return cls.objects.create(
+            owner=owner,
+            stock=stock.upper(),
+            side=side,
+            kind=kind,
+            quantity=quantity,
+            limit_price=limit_price,
+            stop_price=stop_price
+            )
+
+    @classmethod
+    def cancel(cls, owner, id):
+        """
+        Cancel an open order
+
+        :param owner: Trader who placed the order
+        :param id: order pk
+        :return: True if the order was still open and is now cancelled
+        """
+        # Conditional update, so an order being filled cannot also be cancelled
+        return bool(cls.objects.filter(pk=id, owner=owner, status="open").update(status="cancelled"))
+
+class WatchlistItem(models.Model):
+    # Watchlists are kept short enough to price in one batched lookup
+    MAX_ITEMS = 100
+
+    owner = models.ForeignKey("users.Trader", on_delete=models.CASCADE)
+    ticker = models.CharField(max_length=10)
+    added = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "ticker"], name="unique_watchlist_ticker"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.ticker}"
+
+    @classmethod
+    def tickers(cls, owner):
+        """
+        Get the tickers a trader watches, oldest first
+
+        :param owner: Trader
+        :return: list of tickers
+        """
+        return list(cls.objects.filter(owner=owner).order_by("added", "pk").values_list("ticker", flat=True))
+
+    @classmethod
+    def add(cls, owner, ticker):
+        """
+        Add a ticker to a trader's watchlist (adding one already listed does nothing)
+
+        :param owner: Trader
+        :param ticker: stock ticker
+        :raises ValueError: if the ticker is malformed or the watchlist is full
+        :return: True if the ticker was added
+        """
+        ticker = clean_ticker(ticker)
+        if cls.objects.filter(owner=owner).count() >= cls.MAX_ITEMS:
+            raise ValueError(f"A watchlist holds at most {cls.MAX_ITEMS} tickers")
+
+        _, created = cls.objects.get_or_create(owner=owner, ticker=ticker)
+        return created
+
+    @classmethod
+    def remove(cls, owner, ticker):
+        """
+        Remove a ticker from a trader's watchlist
+
+        :param owner: Trader
+        :param ticker: stock ticker
+        :return: True if the ticker was listed
+        """
+        deleted, _ = cls.objects.filter(owner=owner, ticker=ticker.strip().upper()).delete()
+        return bool(deleted)
@@ -0,0 +1,119 @@
+from django.db.transaction import atomic
+from django.utils import timezone
+from lib.OrderBook import OrderBook
+from .models import Order
+
+
+class OrderEngine:
+    def __init__(self):
+        """
+        Match open limit, stop and stop-limit orders against price ticks
+
+        Open orders are mirrored into an OrderBook, so a tick only touches the
+        orders it crosses. Fills run in one database transaction each, writing
+        the Transaction rows, position and balance together with the order status.
+        """
+        self.book = OrderBook()
+
+    def sync(self):
+        """
+        Bring the book in line with the open orders in the database
+
+        Picks up orders placed by the web process since the last call and drops
+        cancelled ones.
+
+        :return: number of open orders
+        """
+        open_orders = Order.objects.filter(status="open")
+        ids = set(open_orders.values_list("pk", flat=True))
+
+        for order_id in [i for i in self.book.orders if i not in ids]:
+            self.book.remove(order_id)
+        new = [i for i in ids if i not in self.book]
+        for order in open_orders.filter(pk__in=new).order_by("created", "pk"):
+            self.add(order)
+        return len(self.book)
+
+    def add(self, order):
+        """
+        Rest an open order in the book
+
+        :param order: Order object
+        """
+        self.book.add(
+            order.pk,
+            order.stock,
+            order.side,
+            order.kind,
+            limit=order.limit_price,
+            stop=order.stop_price,
+            triggered=order.triggered
+            )
+
+    def tickers(self):
+        """
+        :return: list of tickers with open orders
+        """
+        return sorted({order["ticker"] for order in self.book.orders.values()})
+
+    def process_prices(self, prices):
+        """
+        Apply a batch of price ticks
+
+        :param prices: dict of ticker to price
+        :return: list of filled Orders
+        """
+        filled = []
+        for ticker, price in prices.items():
+            filled.extend(self.process_tick(ticker, price))
+        return filled
+
+    def process_tick(self, ticker, price):
+        """
+        Fill every order a price crosses
+
+        :param ticker: stock ticker
+        :param price: latest price
+        :return: list of filled Orders
+        """
+        fills, activated = self.book.on_price(ticker.upper(), price)
+        if activated:
+            # Remember triggered stops, so a restart rests them as limit orders
+            Order.objects.filter(pk__in=activated, status="open").update(triggered=True)
+
+        filled = []
+        for order_id in fills:
+            order = self.fill(order_id, price)
+            if order is not None and order.status == "filled":
+                filled.append(order)
+        return filled
+
+    def fill(self, order_id, price):
+        """
+        Execute one order at the tick price, atomically
+
+        An order that cannot be executed (not enough money or shares) is marked
+        rejected in the same transaction.
+
+        :param order_id: order pk
+        :param price: execution price
+        :return: Order object, or None if it was no longer open
+        """
+        with atomic():
+            order = Order.objects.select_for_update().select_related("owner").filter(pk=order_id, status="open").first()
+            if order is None:
+                return None
+
+            try:
+                if order.side == "buy":
+                    order.owner.buy_shares(order.stock, price, order.quantity)
+                else:
+                    order.owner.sell_shares(order.stock, price, order.quantity)
+            except ValueError:
+                order.status = "rejected"
+            else:
+                order.status = "filled"
+                order.fill_price = price
+                order.filled_at = timezone.now()
+            order.save(update_fields=["status", "fill_price", "filled_at"])
+        return order
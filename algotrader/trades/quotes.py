@@ -0,0 +1,133 @@
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .models import Quote
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_scraper():
+    """
+    Get the process-wide YahooScraper, created on first use
+
+    The scraper modules (and pandas, bs4, requests behind them) are only
+    imported here, so worker boot and management commands that never scrape
+    do not pay for them.
+
+    :return: YahooScraper
+    """
+    scraper = _clients.get("scraper")
+    if scraper is None:
+        with _clients_lock:
+            scraper = _clients.get("scraper")
+            if scraper is None:
+                from lib.YahooScraper import YahooScraper
+                from lib.HistoricalStore import HistoricalStore
+                from lib.MarketDataProvider import make_provider
+
+                scraper = _clients["scraper"] = YahooScraper(
+                    store=HistoricalStore(settings.HISTORICAL_STORE),
+                    provider=make_provider(settings.MARKET_DATA_PROVIDER, settings.MARKET_DATA_FIXTURES)
+                    )
+    return scraper
+
+
+def get_async_scraper():
+    """
+    Get the process-wide AsyncYahooScraper sharing cache, store and provider with get_scraper()
+
+    :return: AsyncYahooScraper
+    """
+    scraper = _clients.get("async_scraper")
+    if scraper is None:
+        shared = get_scraper()
+        with _clients_lock:
+            scraper = _clients.get("async_scraper")
+            if scraper is None:
+                from lib.AsyncYahooScraper import AsyncYahooScraper
+                scraper = _clients["async_scraper"] = AsyncYahooScraper(shared)
+    return scraper
+
+
+def _max_age():
+    return getattr(settings, "QUOTE_MAX_AGE", 60)
+
+
+def _cached(max_age):
+    # The scraper's quote cache may hold prices up to its ttl old
+    return max_age >= get_scraper().quote_cache.ttl
+
+
+def get_prices(tickers, max_age=None):
+    """
+    Get current prices, preferring the table kept fresh by refresh_quotes
+
+    Tickers without a recent stored quote are scraped in one batch and stored.
+
+    :param tickers: list of stock tickers
+    :param max_age: seconds a price may be old (default: settings.QUOTE_MAX_AGE)
+    :return: dict of ticker (upper case) to price, leaving out tickers that could not be priced
+    """
+    return _get_prices(tickers, max_age)[0]
+
+
+def _get_prices(tickers, max_age):
+    # Errors come back with the prices, the shared scraper keeps no per-call state
+    max_age = _max_age() if max_age is None else max_age
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    prices = Quote.fresh(tickers, max_age)
+
+    errors = {}
+    missing = [t for t in tickers if t not in prices]
+    if missing:
+        scraped, errors = get_scraper().get_stock_prices(missing, cached=_cached(max_age))
+        Quote.store(scraped)
+        prices.update(scraped)
+    return prices, errors
+
+
+def get_price(ticker, max_age=None):
+    """
+    Get the current price of one stock
+
+    :param ticker: stock ticker
+    :param max_age: seconds the price may be old (default: settings.QUOTE_MAX_AGE)
+    :raises Exception: whatever the scraper raised if the stock could not be priced
+    :return: float price
+    """
+    prices, errors = _get_prices([ticker], max_age)
+    if ticker.upper() not in prices:
+        raise errors.get(ticker.upper(), LookupError(f"No price for {ticker}"))
+    return prices[ticker.upper()]
+
+
+async def aget_prices(tickers, max_age=None):
+    """
+    Async version of get_prices for async views
+    """
+    return (await _aget_prices(tickers, max_age))[0]
+
+
+async def _aget_prices(tickers, max_age):
+    max_age = _max_age() if max_age is None else max_age
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    prices = await sync_to_async(Quote.fresh)(tickers, max_age)
+
+    errors = {}
+    missing = [t for t in tickers if t not in prices]
+    if missing:
+        scraped, errors = await get_async_scraper().get_stock_prices(missing, cached=_cached(max_age))
+        await sync_to_async(Quote.store)(scraped)
+        prices.update(scraped)
+    return prices, errors
+
+
+async def aget_price(ticker, max_age=None):
+    """
+    Async version of get_price for async views
+    """
+    prices, errors = await _aget_prices([ticker], max_age)
+    if ticker.upper() not in prices:
+        raise errors.get(ticker.upper(), LookupError(f"No price for {ticker}"))
+    return prices[ticker.upper()]
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+
+from .models import clean_ticker
+from .quotes import aget_price
+
+
+class TooManyChannels(RuntimeError):
+    pass
+
+
+class _Channel:
+    def __init__(self):
+        """
+        Subscribers of one ticker and the single task polling its price
+        """
+        self.subscribers = set()
+        self.task = None
+        self.last = None
+
+
+class PriceBroadcaster:
+    def __init__(self, **kwargs):
+        """
+        Fan price updates out to every subscriber of a ticker from one upstream poll per ticker
+
+        :kwarg interval: seconds between polls (default: settings.QUOTE_STREAM_INTERVAL)
+        :kwarg max_channels: most tickers polled at once (default: settings.QUOTE_STREAM_MAX_CHANNELS)
+        """
+        self.interval = kwargs.get("interval", getattr(settings, "QUOTE_STREAM_INTERVAL", 5))
+        self.max_channels = kwargs.get("max_channels", getattr(settings, "QUOTE_STREAM_MAX_CHANNELS", 100))
+        self.channels = {}
+
+    def subscribe(self, ticker):
+        """
+        Start receiving updates for a ticker
+
+        :param ticker: stock ticker
+        :raises TooManyChannels: if the ticker is not streamed yet and max_channels tickers already are
+        :return: asyncio.Queue that always holds at most the latest update
+        """
+        if ticker not in self.channels and len(self.channels) >= self.max_channels:
+            raise TooManyChannels(f"Already streaming {len(self.channels)} tickers")
+
+        channel = self.channels.setdefault(ticker, _Channel())
+        queue = asyncio.Queue(maxsize=1)
+        if channel.last is not None:
+            queue.put_nowait(channel.last)
+
+        channel.subscribers.add(queue)
+        if channel.task is None:
+            channel.task = asyncio.ensure_future(self._poll(ticker, channel))
+        return queue
+
+    def unsubscribe(self, ticker, queue):
+        """
+        Stop receiving updates, stopping the poll once nobody is left
+
+        :param ticker: stock ticker
+        :param queue: queue returned by subscribe
+        """
+        channel = self.channels.get(ticker)
+        if channel is None:
+            return
+
+        channel.subscribers.discard(queue)
+        if not channel.subscribers:
+            channel.task.cancel()
+            del self.channels[ticker]
+
+    async def _poll(self, ticker, channel):
+        while True:
+            try:
+                # Stored and cached quotes older than one tick would repeat a stale price
+                price = await aget_price(ticker, max_age=self.interval)
+            except Exception:
+                price = None
+
+            if price is not None and (channel.last is None or channel.last["price"] != price):
+                channel.last = {"ticker": ticker, "price": price, "time": time.time()}
+                for queue in channel.subscribers:
+                    # Slow clients only ever need the newest price
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(channel.last)
+
+            await asyncio.sleep(self.interval)
+
+
+broadcaster = PriceBroadcaster()
+
+# Seconds of silence before a comment line is sent to keep proxies from closing the stream
+HEARTBEAT = 15
+
+
+async def _disconnected(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+@sync_to_async
+def _session_user(scope):
+    # The stream bypasses Django's middleware, so read the session cookie the same way it does
+    cookies = SimpleCookie()
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user = get_user(SimpleNamespace(session=session))
+    return user if user.is_authenticated else None
+
+
+async def _refuse(send, status, body, headers=()):
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain"), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def sse_application(scope, receive, send):
+    """
+    ASGI app streaming price updates for /stream/<ticker> as Server-Sent Events to logged in traders
+    """
+    try:
+        ticker = clean_ticker(scope["path"][len("/stream/"):].strip("/"))
+    except ValueError:
+        ticker = None
+    if scope["method"] != "GET" or ticker is None:
+        return await _refuse(send, 404, b"Not found")
+    if await _session_user(scope) is None:
+        return await _refuse(send, 403, b"Forbidden")
+
+    try:
+        queue = broadcaster.subscribe(ticker)
+    except TooManyChannels:
+        return await _refuse(send, 503, b"Too many streams", [(b"retry-after", str(HEARTBEAT).encode())])
+
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        while True:
+            update = asyncio.ensure_future(queue.get())
+            done, pending = await asyncio.wait({update, disconnected}, timeout=HEARTBEAT, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                update.cancel()
+                break
+
+            if update in done:
+                body = f"data: {json.dumps(update.result())}\n\n"
+            else:
+                update.cancel()
+                body = ": keep-alive\n\n"
+            await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+    finally:
+        broadcaster.unsubscribe(ticker, queue)
+        disconnected.cancel()
@@ -1,3 +1,479 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+
+from lib import Indicators
+from lib.Backtester import Backtester
+from lib.HistoricalStore import TAIL_TTL, HistoricalStore
+from lib.OrderBook import OrderBook
+from lib.MarketDataProvider import FixtureNotFound, RecordingProvider, ReplayProvider, not_found
+from lib.QuoteCache import QuoteCache
+from lib.Screener import normalize_frame
+from lib.YahooScraper import YahooScraper
+from users.models import Trader
+
+from .models import Order
+from .orders import OrderEngine
+from . import streaming
+from lib.SweepRunner import SweepRunner
+
+
+class BacktesterTests(SimpleTestCase):
+    def test_entry_bar_matches_fill(self):
+        index = pd.date_range("2020-01-01", periods=6)
+        closes = pd.DataFrame({"A": [10.0, 10.0, 20.0, 40.0, 40.0, 40.0]}, index=index)
+
+        def long_from_second_bar(closes):
+            return pd.DataFrame({"A": [0.0, 1.0, 1.0, 1.0, 1.0, 1.0]}, index=closes.index)
+
+        result = Backtester(closes, commission=0.0).run(long_from_second_bar)
+
+        # Signal on bar 1, filled at the close of bar 2, held from bar 3 on
+        self.assertEqual(result.fills["A"].dropna().to_dict(), {index[2]: 20.0})
+        self.assertEqual(result.positions["A"].tolist(), [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+        # The P&L starts from the fill price: 20 -> 40 doubles equity, 10 -> 20 does not count
+        self.assertEqual(result.equity["A"].tolist(), [10000.0, 10000.0, 10000.0, 20000.0, 20000.0, 20000.0])
+        self.assertEqual(result.stats.loc["A", "trades"], 1)
+
+    def test_commission_booked_on_fill_bar(self):
+        index = pd.date_range("2020-01-01", periods=4)
+        closes = pd.DataFrame({"A": [10.0, 10.0, 10.0, 10.0]}, index=index)
+        result = Backtester(closes, commission=0.01).run(lambda c: pd.DataFrame({"A": 1.0}, index=c.index))
+
+        np.testing.assert_allclose(result.equity["A"].to_numpy(), [10000.0, 9900.0, 9900.0, 9900.0])
+        self.assertEqual(result.fills["A"].notna().tolist(), [False, True, False, False])
+
+
+class IndicatorsTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        close = 100 + np.cumsum(rng.normal(0, 1, 120))
+        close[[0, 40, 41, 90]] = np.nan
+        high, low = close + rng.uniform(0, 2, 120), close - rng.uniform(0, 2, 120)
+        high[60] = np.nan
+        self.df = pd.DataFrame({"High": high, "Low": low, "Close": close})
+
+    def assertStreams(self, batch, stream, prices):
+        # Streaming warm-up is None where batch mode has NaN
+        batch = np.asarray(batch, dtype="float64")
+        streamed = [stream.update(*p) if isinstance(p, tuple) else stream.update(p) for p in prices]
+        values = np.array([np.full(batch.shape[1:], np.nan) if v is None else v for v in streamed], dtype="float64")
+        np.testing.assert_array_equal(values, batch)
+
+    def test_batch_matches_streaming_with_missing_bars(self):
+        close = self.df["Close"]
+        prices = close.tolist()
+        self.assertStreams(Indicators.sma(close, 20), Indicators.SMA(20), prices)
+        self.assertStreams(Indicators.ema(close, 20), Indicators.EMA(20), prices)
+        self.assertStreams(Indicators.rsi(close, 14), Indicators.RSI(14), prices)
+
+        middle, upper, lower = Indicators.bollinger(close, 20)
+        bands = Indicators.BollingerBands(20)
+        self.assertStreams(np.column_stack([middle, upper, lower]), bands, prices)
+
+        line, signal_line, histogram = Indicators.macd(close)
+        self.assertStreams(np.column_stack([line, signal_line, histogram]), Indicators.MACD(), prices)
+
+        bars = list(zip(self.df["High"], self.df["Low"], close))
+        self.assertStreams(Indicators.atr(self.df["High"], self.df["Low"], close, 14), Indicators.ATR(14), bars)
+
+    def test_missing_bar_does_not_poison_streaming_sum(self):
+        sma = Indicators.SMA(3)
+        values = [sma.update(p) for p in [1.0, 2.0, np.nan, 3.0, 4.0, 5.0, 6.0]]
+        self.assertEqual(values, [None, None, None, None, None, 4.0, 5.0])
+
+
+class OrderBookTests(SimpleTestCase):
+    def test_limit_directions(self):
+        book = OrderBook()
+        book.add("buy", "A", "buy", "limit", limit=100.0)
+        book.add("sell", "A", "sell", "limit", limit=110.0)
+
+        # Buy limits fill at or below their limit, sell limits at or above
+        self.assertEqual(book.on_price("A", 105.0), ([], []))
+        self.assertEqual(book.on_price("A", 100.0), (["buy"], []))
+        self.assertEqual(book.on_price("A", 109.99), ([], []))
+        self.assertEqual(book.on_price("A", 110.0), (["sell"], []))
+        self.assertEqual(len(book), 0)
+
+    def test_stop_directions(self):
+        book = OrderBook()
+        book.add("buy", "A", "buy", "stop", stop=110.0)
+        book.add("sell", "A", "sell", "stop", stop=90.0)
+
+        book.add("sell first", "A", "sell", "stop", stop=91.0)
+
+        # Buy stops trigger at or above their stop, sell stops at or below
+        self.assertEqual(book.on_price("A", 100.0), ([], []))
+        self.assertEqual(book.on_price("A", 110.0), (["buy"], []))
+        self.assertEqual(book.on_price("A", 90.0), (["sell first", "sell"], []))
+
+    def test_stop_limit_activates_before_it_can_fill(self):
+        book = OrderBook()
+        book.add("jump", "A", "buy", "stop_limit", stop=105.0, limit=103.0)
+        book.add("step", "A", "buy", "stop_limit", stop=105.0, limit=106.0)
+
+        # Both stops trigger; only the limit the same tick satisfies fills
+        self.assertEqual(book.on_price("A", 105.5), (["step"], ["jump", "step"]))
+        self.assertEqual(book.orders["jump"]["kind"], "limit")
+        self.assertEqual(book.on_price("A", 104.0), ([], []))
+        self.assertEqual(book.on_price("A", 103.0), (["jump"], []))
+
+    def test_triggered_stop_limit_rests_as_limit(self):
+        book = OrderBook()
+        book.add(1, "A", "sell", "stop_limit", stop=90.0, limit=95.0, triggered=True)
+
+        self.assertEqual(book.on_price("A", 95.0), ([1], []))
+
+    def test_price_time_priority(self):
+        book = OrderBook()
+        book.add("early", "A", "buy", "limit", limit=100.0)
+        book.add("replaced", "A", "buy", "limit", limit=100.0)
+        book.add("late", "A", "buy", "limit", limit=100.0)
+        book.add("best", "A", "buy", "limit", limit=101.0)
+        book.add("replaced", "A", "buy", "limit", limit=100.0)
+        book.add("low", "B", "sell", "limit", limit=90.0)
+        book.add("first", "B", "sell", "limit", limit=95.0)
+        book.add("second", "B", "sell", "limit", limit=95.0)
+
+        # Best price first, then the order they were placed in (re-adding loses priority)
+        self.assertEqual(book.on_price("A", 100.0)[0], ["best", "early", "late", "replaced"])
+        self.assertEqual(book.on_price("B", 96.0)[0], ["low", "first", "second"])
+
+    def test_missing_prices_are_rejected(self):
+        book = OrderBook()
+        with self.assertRaises(ValueError):
+            book.add(1, "A", "buy", "limit")
+        with self.assertRaises(ValueError):
+            book.add(2, "A", "sell", "stop_limit", limit=10.0)
+
+
+class OrderEngineTests(TestCase):
+    def setUp(self):
+        self.trader = Trader.objects.create_user("trader", "trader@example.com", "password")
+        self.engine = OrderEngine()
+
+    def place(self, side, kind, quantity, **kwargs):
+        order = Order.place(self.trader, "aapl", side, kind, quantity, **kwargs)
+        self.engine.sync()
+        return order
+
+    def test_fills_buy_and_sell_limits(self):
+        buy = self.place("buy", "limit", 10, limit_price=100)
+        sell = self.place("sell", "limit", 4, limit_price=120)
+
+        self.assertEqual(self.engine.process_prices({"AAPL": 99.0}), [buy])
+        self.assertEqual(self.engine.process_prices({"AAPL": 121.0}), [sell])
+
+        buy.refresh_from_db()
+        sell.refresh_from_db()
+        self.trader.refresh_from_db()
+        self.assertEqual((buy.status, buy.fill_price), ("filled", 99.0))
+        self.assertEqual((sell.status, sell.fill_price), ("filled", 121.0))
+        self.assertEqual(self.trader.balance, 10000.0 - 990.0 + 484.0)
+        self.assertEqual(self.trader.get_positions().get(stock="AAPL").quantity, 6)
+
+    def test_rejects_orders_that_cannot_execute(self):
+        expensive = self.place("buy", "limit", 1000, limit_price=100)
+        unowned = self.place("sell", "stop", 1, stop_price=90)
+
+        self.assertEqual(self.engine.process_prices({"AAPL": 100.0}), [])
+        self.assertEqual(self.engine.process_prices({"AAPL": 90.0}), [])
+
+        self.assertEqual(Order.objects.get(pk=expensive.pk).status, "rejected")
+        self.assertEqual(Order.objects.get(pk=unowned.pk).status, "rejected")
+        self.trader.refresh_from_db()
+        self.assertEqual(self.trader.balance, 10000.0)
+        self.assertEqual(len(self.engine.book), 0)
+
+    def test_triggered_stop_limit_survives_restart(self):
+        order = self.place("buy", "stop_limit", 1, stop_price=105, limit_price=103)
+
+        self.assertEqual(self.engine.process_prices({"AAPL": 106.0}), [])
+        self.assertTrue(Order.objects.get(pk=order.pk).triggered)
+
+        # A new engine rests it as a limit order instead of waiting for the stop again
+        restarted = OrderEngine()
+        restarted.sync()
+        self.assertEqual([o.pk for o in restarted.process_prices({"AAPL": 103.0})], [order.pk])
+
+    def test_sync_drops_cancelled_orders(self):
+        order = self.place("buy", "limit", 1, limit_price=100)
+        Order.cancel(self.trader, order.pk)
+
+        self.assertEqual(self.engine.sync(), 0)
+        self.assertEqual(self.engine.process_prices({"AAPL": 90.0}), [])
+
+
+DAY = 86400
+
+
+def _bars(*days):
+    index = pd.to_datetime([d * DAY for d in days], unit="s")
+    values = np.arange(len(days), dtype="float64")
+    return pd.DataFrame({column: values for column in ["Open", "High", "Low", "Close", "Adj Close", "Volume"]}, index=index)
+
+
+
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.trader = Trader.objects.create_user("trader", "trader@example.com", "password")
+        self.client.force_login(self.trader)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}".encode()
+
+    async def stream(self, path, cookie=None):
+        # Disconnect as soon as the first price arrives
+        sent = []
+        got_price = asyncio.Event()
+
+        async def receive():
+            await got_price.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body", b"").startswith(b"data:"):
+                got_price.set()
+
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"cookie", cookie)] if cookie else []}
+        await asyncio.wait_for(streaming.sse_application(scope, receive, send), 5)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+    @mock.patch("trades.streaming.aget_price", mock.AsyncMock(return_value=101.5))
+    async def test_streams_prices_to_logged_in_traders(self):
+        with mock.patch.object(streaming, "broadcaster", streaming.PriceBroadcaster(interval=0.01)):
+            status, body = await self.stream("/stream/aapl", self.cookie)
+            self.assertEqual(streaming.broadcaster.channels, {})
+
+        self.assertEqual(status, 200)
+        self.assertIn(b'"ticker": "AAPL", "price": 101.5', body)
+
+    async def test_refuses_anonymous_and_malformed_requests(self):
+        self.assertEqual((await self.stream("/stream/AAPL"))[0], 403)
+        self.assertEqual((await self.stream("/stream/AAPL", b"sessionid=forged"))[0], 403)
+        self.assertEqual((await self.stream("/stream/A$B", self.cookie))[0], 404)
+        self.assertEqual((await self.stream("/stream/ABCDEFGHIJK", self.cookie))[0], 404)
+
+    @mock.patch("trades.streaming.aget_price", mock.AsyncMock(return_value=101.5))
+    async def test_caps_concurrent_channels(self):
+        with mock.patch.object(streaming, "broadcaster", streaming.PriceBroadcaster(interval=0.01, max_channels=1)):
+            queue = streaming.broadcaster.subscribe("MSFT")
+            try:
+                self.assertEqual((await self.stream("/stream/AAPL", self.cookie))[0], 503)
+                # Tickers already polled can still be joined
+                self.assertEqual((await self.stream("/stream/MSFT", self.cookie))[0], 200)
+            finally:
+                streaming.broadcaster.unsubscribe("MSFT", queue)
+
+class HistoricalStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.store = HistoricalStore(os.path.join(self.root.name, "bars.sqlite3"))
+        # Noon on day 100
+        self.now = 100 * DAY + DAY // 2
+        self.clock = mock.patch("lib.HistoricalStore.time.time", lambda: self.now)
+        self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        self.store.conn.close()
+        self.root.cleanup()
+
+    def test_gaps_between_stored_ranges(self):
+        self.store.save("A", "d", _bars(10, 11), 10 * DAY, 12 * DAY)
+        self.store.save("A", "d", _bars(20), 20 * DAY, 21 * DAY)
+
+        self.assertEqual(self.store.missing("A", "d", 5 * DAY, 25 * DAY), [(5 * DAY, 10 * DAY), (12 * DAY, 20 * DAY), (21 * DAY, 25 * DAY)])
+        self.assertEqual(self.store.missing("A", "d", 10 * DAY, 12 * DAY), [])
+        self.assertEqual(self.store.missing("A", "d", 11 * DAY, 15 * DAY), [(12 * DAY, 15 * DAY)])
+        self.assertEqual(self.store.missing("B", "d", 10 * DAY, 12 * DAY), [(10 * DAY, 12 * DAY)])
+
+    def test_touching_and_overlapping_ranges_merge(self):
+        self.store.save("A", "d", _bars(10), 10 * DAY, 12 * DAY)
+        self.store.save("A", "d", _bars(20), 20 * DAY, 22 * DAY)
+        self.store.save("A", "d", _bars(12), 12 * DAY, 15 * DAY)
+        self.assertEqual(self.store.ranges("A", "d"), [(10 * DAY, 15 * DAY), (20 * DAY, 22 * DAY)])
+
+        self.store.save("A", "d", _bars(14, 21), 14 * DAY, 21 * DAY)
+        self.assertEqual(self.store.ranges("A", "d"), [(10 * DAY, 22 * DAY)])
+
+    def test_tickers_are_case_insensitive(self):
+        self.store.save("aapl", "d", _bars(10, 11), 10 * DAY, 12 * DAY)
+
+        self.assertEqual(self.store.missing("AAPL", "d", 10 * DAY, 12 * DAY), [])
+        self.assertEqual(self.store.load("Aapl", "d", 10 * DAY, 12 * DAY)["Close"].tolist(), [0.0, 1.0])
+        self.assertEqual(list(self.store.load_many(["aapl"], "d", 10 * DAY, 12 * DAY).columns), ["AAPL"])
+
+    def test_open_day_is_covered_for_a_while(self):
+        self.store.save("A", "d", _bars(98, 99, 100), 98 * DAY, self.now)
+
+        # Settled days for good, today only until TAIL_TTL has passed
+        self.assertEqual(self.store.ranges("A", "d"), [(98 * DAY, 100 * DAY)])
+        self.now += 60
+        self.assertEqual(self.store.missing("A", "d", 98 * DAY, self.now), [])
+        self.now += TAIL_TTL
+        self.assertEqual(self.store.missing("A", "d", 98 * DAY, self.now), [(100 * DAY, self.now)])
+
+
+class _Payloads:
+    def __init__(self, *payloads):
+        self.payloads = list(payloads)
+
+    def fetch(self, kind, ticker, **params):
+        return self.payloads.pop(0)
+
+
+class RecordingProviderTests(SimpleTestCase):
+    def test_merges_unterminated_and_out_of_order_ranges(self):
+        payloads = _Payloads(
+            b"Date,Close\n2020-01-02,2\n2020-01-03,3",
+            b"Date,Close\r\n2020-01-06,6\r\n2020-01-01,1\r\n",
+            b"Date,Close\n2020-01-03,3.5\n\n2020-01-07,7",
+            )
+        with tempfile.TemporaryDirectory() as root:
+            recorder = RecordingProvider(payloads, root)
+            for _ in range(3):
+                recorder.fetch("historical", "aapl", interval="d")
+            recorded = recorder.replay.path("historical", "AAPL", interval="d").read_bytes()
+            # 2020-01-02 00:00 to 2020-01-06 00:00 UTC
+            sliced = ReplayProvider(root).fetch("historical", "AAPL", interval="d", period1=1577923200, period2=1578268800)
+
+        self.assertEqual(
+            recorded,
+            b"Date,Close\n2020-01-01,1\n2020-01-02,2\n2020-01-03,3.5\n2020-01-06,6\n2020-01-07,7\n"
+            )
+        self.assertEqual(sliced, b"Date,Close\n2020-01-02,2\n2020-01-03,3.5\n")
+
+
+    def test_only_missing_tickers_are_not_found(self):
+        request = httpx.Request("GET", "https://query1.finance.yahoo.com/v7/finance/download/ZZZZ")
+        self.assertTrue(not_found(FixtureNotFound("ZZZZ")))
+        self.assertTrue(not_found(httpx.HTTPStatusError("", request=request, response=httpx.Response(404, request=request))))
+        self.assertFalse(not_found(httpx.HTTPStatusError("", request=request, response=httpx.Response(500, request=request))))
+        # Bugs that happen to be LookupErrors must not pass for an unknown ticker
+        self.assertFalse(not_found(KeyError("Close")))
+        self.assertFalse(not_found(IndexError()))
+
+class QuoteCacheTests(SimpleTestCase):
+    def test_async_waiters_do_not_hold_executor_threads(self):
+        cache = QuoteCache()
+
+        async def fetch(key):
+            # Like the replay provider, the owner itself needs an executor thread,
+            # asked for only after every waiter has started waiting
+            await asyncio.sleep(0.01)
+            await asyncio.to_thread(time.sleep, 0.01)
+            return key.lower()
+
+        async def lookups():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(2))
+            keys = [f"T{i}" for i in range(20) for _ in range(10)]
+            return await asyncio.wait_for(
+                asyncio.gather(*[cache.aget(key, lambda key=key: fetch(key)) for key in keys]), 10
+                )
+
+        values = asyncio.run(lookups())
+
+        self.assertEqual(values[::10], [f"t{i}" for i in range(20)])
+        self.assertEqual((cache.misses, cache.coalesced), (20, 180))
+
+    def test_async_waiter_gets_owner_error(self):
+        cache = QuoteCache()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise LookupError("no price")
+
+        async def lookups():
+            return await asyncio.gather(cache.aget("A", fail), cache.aget("A", fail), return_exceptions=True)
+
+        errors = asyncio.run(lookups())
+
+        self.assertTrue(all(isinstance(e, LookupError) for e in errors))
+        self.assertEqual(cache.misses, 1)
+
+
+class ScreenerTests(SimpleTestCase):
+    def test_normalize_frame_keeps_values_of_lowercase_tickers(self):
+        df = pd.DataFrame({"Trailing P/E": ["20.5", "N/A"], "Market Cap": ["2.5T", "1B"]}, index=["aapl", "Msft"])
+        result = normalize_frame(df)
+
+        self.assertEqual(result.index.tolist(), ["AAPL", "MSFT"])
+        self.assertEqual(result.loc["AAPL", "pe"], 20.5)
+        self.assertEqual(result["market_cap"].tolist(), [2.5e12, 1e9])
+
+
+class SweepRunnerTests(SimpleTestCase):
+    def test_sweeps_share_a_checkpoint(self):
+        index = pd.bdate_range("2020-01-01", periods=300)
+        closes = pd.DataFrame({"A": np.linspace(100, 130, 300), "B": np.linspace(100, 80, 300)}, index=index)
+        crossover = {"fast": [5, 10], "slow": [50]}
+        momentum = {"lookback": [20, 40]}
+
+        with tempfile.TemporaryDirectory() as root:
+            checkpoint = os.path.join(root, "sweep.csv")
+            first = SweepRunner(closes, workers=1, checkpoint=checkpoint).run("sma_crossover", crossover)
+            SweepRunner(closes, workers=1, checkpoint=checkpoint).run("momentum", momentum)
+
+            results = SweepRunner(closes, workers=1, checkpoint=checkpoint).run("sma_crossover", crossover)
+            resumed = SweepRunner(closes, workers=1, checkpoint=checkpoint).run("momentum", momentum)
+            rows = len(pd.read_csv(checkpoint))
+
+        # Both sweeps resume from the file without running or appending again
+        self.assertEqual(rows, 4)
+        self.assertEqual(sorted(resumed["lookback"]), [20, 40])
+        self.assertEqual(list(resumed.columns), ["lookback", "sharpe", "total_return", "cagr", "max_drawdown", "trades", "exposure", "bars_per_second", "key"])
+        self.assertEqual(list(results.columns), list(first.columns))
+        pd.testing.assert_frame_equal(
+            results.drop(columns="bars_per_second"), first.drop(columns="bars_per_second"), check_dtype=False
+            )
+
+    def test_rejects_other_csv_as_checkpoint(self):
+        closes = pd.DataFrame({"A": np.linspace(100, 130, 100)}, index=pd.bdate_range("2020-01-01", periods=100))
+        with tempfile.TemporaryDirectory() as root:
+            checkpoint = os.path.join(root, "sweep.csv")
+            pd.DataFrame({"fast": [5], "sharpe": [1.0]}).to_csv(checkpoint, index=False)
+            with self.assertRaises(ValueError):
+                SweepRunner(closes, workers=1, checkpoint=checkpoint).run("sma_crossover", {"fast": [5], "slow": [50]})
+
+
+def _statement(rows):
+    cells = "".join(
+        f'<div data-test="fin-row"><div class="D(tbr) fi-row"><div class="D(tbc)" title="{label}"><span>{label}</span></div>'
+        + "".join(f'<div data-test="fin-col"><span>{v}</span></div>' for v in values)
+        + "</div></div>"
+        for label, values in rows
+        )
+    return (
+        '<div class="D(tbhg)"><div class="D(tbr)"><div><span>Breakdown</span></div>'
+        '<div><span>ttm</span></div><div><span>9/30/2022</span></div></div></div>'
+        f'<div class="D(tbrg)">{cells}</div>'
+        )
+
+
+class StatementTests(SimpleTestCase):
+    def test_per_share_items_are_not_scaled(self):
+        page = _statement([
+            ("Total Revenue", ["394,328,000", "365,817,000"]),
+            ("Basic EPS", ["6.15", "5.67"]),
+            ("Diluted EPS", ["6.11", "-"]),
+            ("Tax Rate for Calcs", ["0.16", "0.13"]),
+            ])
+
+        df = YahooScraper().parse_statement(page)
+
+        self.assertEqual(df.index.tolist(), ["TTM", "2022-09-30"])
+        self.assertEqual(df["Total Revenue"].tolist(), [394328000000.0, 365817000000.0])
+        self.assertEqual(df["Basic EPS"].tolist(), [6.15, 5.67])
+        self.assertEqual(df.loc["TTM", "Diluted EPS"], 6.11)
+        self.assertTrue(np.isnan(df.loc["2022-09-30", "Diluted EPS"]))
+        self.assertEqual(df["Tax Rate for Calcs"].tolist(), [0.16, 0.13])
@@ -1,8 +1,19 @@
+import time
+from datetime import datetime, timezone
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from lib.YahooScraper import YahooScraper
+from django.utils.http import url_has_allowed_host_and_scheme
+from users.views import get_authenticated_user
+from .models import Order, WatchlistItem
+from .quotes import aget_price, aget_prices, get_async_scraper
 from math import floor
 
-y = YahooScraper()
+# Chart ranges selectable on the stock page, in days
+CHART_RANGES = {"1mo": 31, "3mo": 92, "6mo": 183, "1y": 365, "2y": 730, "5y": 1826, "10y": 3652}
+CHART_POINTS = 400
+CHART_MAX_POINTS = 1000
 
 # Create your views here.
 
@@ -13,39 +24,160 @@ def stock_view(request):
     else:
         return render(request, "trades/stock.html")
 
-def stock_search_view(request, **kwargs):
+async def stock_search_view(request, **kwargs):
     ticker = kwargs.get("ticker")
+    user = await get_authenticated_user(request)
 
     if request.method == "POST":
-        if request.user.is_authenticated:
+        if user:
             stock = request.POST["stock"]
             quantity = request.POST["quantity"]
+            side = request.POST.get("side", "buy")
+            order_type = request.POST.get("order_type", "market")
 
-            price = y.get_stock_price(stock)
-            for i in range(int(quantity)):
-                request.user.buy(stock, price)
+            try:
+                if order_type == "market":
+                    price = await aget_price(stock)
+                    trade = user.sell_shares if side == "sell" else user.buy_shares
+                    await sync_to_async(trade)(stock, price, quantity)
+                else:
+                    # Rests until the refresh_quotes worker sees a price that crosses it
+                    await sync_to_async(Order.place)(
+                        user, stock, side, order_type, quantity,
+                        limit_price=request.POST.get("limit_price"),
+                        stop_price=request.POST.get("stop_price")
+                        )
+            except (LookupError, ValueError):
+                # Bad order, no price, not enough money or shares: nothing was traded
+                return redirect(f"/stock/{stock}")
 
             return redirect("profile")
         else:
             return redirect("login")
     else:
-        price = y.get_stock_price(ticker)
-        historical = y.get_historical([ticker])
-        daterange = list(historical.index)
-        close = [float(n) for n in list(historical["Close"])]
+        # The chart loads its history from chart_view, so the page only needs the price
+        try:
+            price = await aget_price(ticker)
+        except (LookupError, ValueError):
+            # No recognizable price on the quote page, show the page without trading
+            price = None
 
-        if (request.user.is_authenticated):
-            max_quant = floor(request.user.balance/price)
+        if user:
+            # Buys are limited by cash at the order's price, sells by the shares held
+            cash = user.balance
+            owned = await sync_to_async(user.get_positions().filter(stock=ticker.upper()).values_list("quantity", flat=True).first)() or 0
+            watched = await sync_to_async(WatchlistItem.objects.filter(owner=user, ticker=ticker.upper()).exists)()
         else:
-            max_quant = 1
+            cash = 0
+            owned = 0
+            watched = False
         
         data = {
             "ticker": ticker,
             "price": price,
-            "daterange": daterange,
-            "close": close,
+            "ranges": list(CHART_RANGES),
+            "watched": watched,
 
-            "max_quant": max_quant
+            "cash": cash,
+            "owned": owned,
+            "max_buy": floor(cash/price) if price else None
         }
 
     return render(request, "trades/search.html", {"data": data})
+
+def _update_watchlist(user, action, ticker):
+    if action == "Remove":
+        WatchlistItem.remove(user, ticker)
+    else:
+        WatchlistItem.add(user, ticker)
+
+async def watchlist_view(request):
+    user = await get_authenticated_user(request)
+    if not user:
+        return redirect_to_login(request.get_full_path())
+
+    if request.method == "POST":
+        try:
+            await sync_to_async(_update_watchlist)(user, request.POST.get("submit"), request.POST.get("ticker", ""))
+        except ValueError:
+            # Malformed ticker or full watchlist, nothing changed
+            pass
+        next_url = request.POST.get("next")
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = "watchlist"
+        return redirect(next_url)
+
+    tickers = await sync_to_async(WatchlistItem.tickers)(user)
+    # One batched, deduplicated lookup: stored quotes first, then every missing ticker concurrently
+    prices = await aget_prices(tickers)
+    items = [{"ticker": t, "price": prices.get(t)} for t in tickers]
+
+    return render(request, "trades/watchlist.html", {"items": items, "max_items": WatchlistItem.MAX_ITEMS})
+
+def _chart_timestamp(text):
+    # Unix timestamp or YYYY-MM-DD
+    if text.isdigit():
+        return int(text)
+    return round(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+def _chart_values(values):
+    return [None if v != v else v for v in values.round(4).tolist()]
+
+async def chart_view(request, ticker):
+    """
+    Price history of a stock downsampled to a bounded number of points, as compact JSON
+
+    Query parameters: range (a CHART_RANGES key, default 1y) or period1 and
+    period2 (unix timestamps or YYYY-MM-DD), interval (d, wk, mo), points and
+    mode ("line": LTTB over close prices, "ohlc": candles). The response holds
+    one array per field, with times in unix seconds.
+    """
+    from lib import Indicators
+    from lib.Downsample import lttb, ohlc
+    from lib.MarketDataProvider import not_found
+
+    params = request.GET
+    interval = params.get("interval", "d")
+    mode = params.get("mode", "line")
+    try:
+        points = min(max(int(params.get("points", CHART_POINTS)), 3), CHART_MAX_POINTS)
+        if "period1" in params:
+            period1 = _chart_timestamp(params["period1"])
+            period2 = _chart_timestamp(params["period2"]) if "period2" in params else round(time.time())
+        else:
+            period2 = round(time.time())
+            period1 = period2 - CHART_RANGES[params.get("range", "1y")] * 86400
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Invalid range or points"}, status=400)
+    if interval not in ("d", "wk", "mo") or mode not in ("line", "ohlc") or period1 >= period2:
+        return JsonResponse({"error": "Invalid interval, mode or range"}, status=400)
+
+    try:
+        historical = await get_async_scraper().get_historical([ticker], period1=period1, period2=period2, interval=interval)
+    except Exception as error:
+        if not_found(error):
+            return JsonResponse({"error": f"Unknown ticker {ticker}"}, status=404)
+        return JsonResponse({"error": f"Could not get price history for {ticker}"}, status=502)
+    if "Close" not in historical.columns:
+        return JsonResponse({"error": f"Unknown ticker {ticker}"}, status=404)
+    historical = historical.dropna(subset=["Close"])
+    # Indicators use every bar; only the result is downsampled
+    historical["SMA"] = Indicators.sma(historical["Close"], 20)
+    bars = len(historical)
+
+    if mode == "line":
+        historical = historical.iloc[lttb(historical["Close"], points)] if bars else historical
+        fields = {"c": "Close", "sma": "SMA"}
+    else:
+        historical = ohlc(historical[["Open", "High", "Low", "Close", "Volume", "SMA"]], points)
+        fields = {"o": "Open", "h": "High", "l": "Low", "c": "Close", "v": "Volume", "sma": "SMA"}
+
+    data = {
+        "ticker": ticker,
+        "interval": interval,
+        "mode": mode,
+        "bars": bars,
+        "t": historical.index.astype("datetime64[s]").astype("int64").tolist(),
+        **{key: _chart_values(historical[column]) for key, column in fields.items()},
+    }
+    return JsonResponse(data, json_dumps_params={"separators": (",", ":")})
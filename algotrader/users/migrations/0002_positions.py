@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_positions(apps, schema_editor):
+    Transaction = apps.get_model("users", "Transaction")
+    Position = apps.get_model("users", "Position")
+
+    positions = {}
+    for t in Transaction.objects.all().iterator():
+        key = (t.owner_id, t.stock.upper())
+        p = positions.setdefault(key, Position(owner_id=t.owner_id, stock=key[1]))
+        if t.sold:
+            p.realized += (t.price_sold or 0.0) - t.price_purchased
+        else:
+            p.quantity += 1
+            p.cost_basis += t.price_purchased
+
+    Position.objects.bulk_create(positions.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.CharField(max_length=10)),
+                ('quantity', models.IntegerField(default=0)),
+                ('cost_basis', models.FloatField(default=0.0)),
+                ('realized', models.FloatField(default=0.0, verbose_name='realized P&L')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'sold'], name='users_trans_owner_i_b5d4be_idx'),
+        ),
+        migrations.AddField(
+            model_name='position',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='position',
+            constraint=models.UniqueConstraint(fields=('owner', 'stock'), name='unique_position'),
+        ),
+        migrations.RunPython(build_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_positions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='users_trans_owner_i_b5d4be_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'sold', 'date_purchased'], name='users_trans_owner_i_efd31a_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_transaction_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'date_purchased', 'id'], name='users_trans_owner_i_093a5e_idx'),
+        ),
+    ]
@@ -1,10 +1,12 @@
 from django.db import models
+from django.db.models import F, Q
+from datetime import datetime
+import base64
+from django.db.transaction import atomic
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from lib.YahooScraper import YahooScraper
-
-y = YahooScraper()
+from trades.quotes import get_price
 
 # Create your models here.
 
@@ -66,48 +68,172 @@ class Trader(AbstractBaseUser):
 
         :param stock: stock to buy
         :param price: price of stock at purchase
+        :raises ValueError: if the balance is too low
         :return: Transaction object
         """
-        # Create new transaction
-        new_transaction = Transaction.objects.create(
-            owner=self,
-            stock=stock, 
-            price_purchased=price
-            )
-        new_transaction.save()
+        with atomic():
+            # Conditional UPDATE in the database instead of read-modify-write in Python,
+            # so concurrent orders from other workers cannot overwrite each other
+            updated = Trader.objects.filter(pk=self.pk, balance__gte=price).update(balance=F("balance") - price)
+            if not updated:
+                raise ValueError("Insufficient balance")
 
-        # Update balance
-        self.balance -= price
-        self.save()
+            new_transaction = Transaction.objects.create(
+                owner=self,
+                stock=stock, 
+                price_purchased=price
+                )
+            self._update_position(stock, 1, price)
+
+        self.refresh_from_db(fields=["balance"])
         return new_transaction
     
-    def sell(self, id):
+    def buy_shares(self, stock, price, quantity):
+        """
+        Purchase several shares at once, atomically
+
+        :param stock: stock to buy
+        :param price: price of stock at purchase
+        :param quantity: number of shares
+        :raises ValueError: if quantity is not positive or the balance is too low
+        :return: list of Transaction objects
+        """
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        cost = price * quantity
+
+        with atomic():
+            # Single conditional UPDATE, so the balance can never go negative
+            updated = Trader.objects.filter(pk=self.pk, balance__gte=cost).update(balance=F("balance") - cost)
+            if not updated:
+                raise ValueError("Insufficient balance")
+
+            transactions = Transaction.objects.bulk_create([
+                Transaction(owner=self, stock=stock, price_purchased=price)
+                for i in range(quantity)
+                ])
+            self._update_position(stock, quantity, cost)
+
+        self.refresh_from_db(fields=["balance"])
+        return transactions
+
+    def sell(self, id, price=None):
         """
         Sell a share
 
         :param id: transaction pk
+        :param price: price to sell at (default: current market price)
+        :raises Transaction.DoesNotExist: if the transaction is not this trader's
+        :raises ValueError: if the share was already sold
         """
-        transaction = Transaction.objects.get(pk=id)
-        price_sold = y.get_stock_price(transaction.stock)
+        transaction = Transaction.objects.get(pk=id, owner=self)
+        if transaction.sold:
+            raise ValueError("Share already sold")
+        price_sold = price if price is not None else get_price(transaction.stock)
 
-        # Change transaction fields
-        transaction.sold = True
-        transaction.price_sold = price_sold
-        transaction.date_sold = timezone.now()
-        transaction.save()
+        with atomic():
+            # Write first: the conditional UPDATE locks the row and only flips it if it
+            # is still unsold, so a replayed or concurrent sell is rejected instead of
+            # paid twice (and SQLite never has to upgrade a read lock mid-transaction)
+            updated = Transaction.objects.filter(pk=id, sold=False).update(
+                sold=True,
+                price_sold=price_sold,
+                date_sold=timezone.now()
+                )
+            if not updated:
+                raise ValueError("Share already sold")
+
+            bought = transaction.price_purchased
+            self._update_position(transaction.stock, -1, -bought, price_sold - bought)
+            Trader.objects.filter(pk=self.pk).update(balance=F("balance") + price_sold)
+
+        self.refresh_from_db(fields=["balance"])
+
+    def _lock_account(self):
+        # Write before reading: on SQLite (where select_for_update does nothing) this takes
+        # the database write lock up front instead of upgrading a read lock, which fails with
+        # "database is locked" under contention; elsewhere it locks this trader's row
+        Trader.objects.filter(pk=self.pk).update(balance=F("balance"))
+
+    def sell_shares(self, stock, price, quantity):
+        """
+        Sell several shares of a stock at once, oldest first, atomically
+
+        :param stock: stock to sell
+        :param price: price to sell at
+        :param quantity: number of shares
+        :raises ValueError: if quantity is not positive or fewer shares are owned
+        :return: list of sold transaction pks
+        """
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+
+        with atomic():
+            self._lock_account()
+            owned = Transaction.objects.select_for_update().filter(owner=self, stock__iexact=stock, sold=False)
+            lots = list(owned.order_by("date_purchased", "pk").values_list("pk", "price_purchased")[:quantity])
+            if len(lots) < quantity:
+                raise ValueError("Not enough shares owned")
+
+            ids = [pk for pk, bought in lots]
+            cost = sum(bought for pk, bought in lots)
+            # Only rows still unsold are updated; anything less means a concurrent sale
+            updated = Transaction.objects.filter(pk__in=ids, sold=False).update(
+                sold=True,
+                price_sold=price,
+                date_sold=timezone.now()
+                )
+            if updated != quantity:
+                raise ValueError("Shares were sold concurrently")
+
+            self._update_position(stock, -quantity, -cost, price * quantity - cost)
+            Trader.objects.filter(pk=self.pk).update(balance=F("balance") + price * quantity)
+
+        self.refresh_from_db(fields=["balance"])
+        return ids
 
-        # Change balance
-        self.balance += price_sold
-        self.save()
-    
     def delete(self, id):
         """
         Delete a transaction
 
         :param id: transaction pk
         """
-        transaction = Transaction.objects.get(pk=id)
-        transaction.delete()
+        with atomic():
+            self._lock_account()
+            transaction = Transaction.objects.select_for_update().get(pk=id, owner=self)
+            if not transaction.sold:
+                self._update_position(transaction.stock, -1, -transaction.price_purchased)
+            transaction.delete()
+
+    def _update_position(self, stock, quantity, cost, realized=0.0):
+        """
+        Apply a change to the aggregated position in a stock
+
+        :param stock: stock ticker
+        :param quantity: change in shares held
+        :param cost: change in cost basis
+        :param realized: realized profit or loss to add
+        """
+        position, created = Position.objects.get_or_create(owner=self, stock=stock.upper())
+        Position.objects.filter(pk=position.pk).update(
+            quantity=F("quantity") + quantity,
+            cost_basis=F("cost_basis") + cost,
+            realized=F("realized") + realized
+            )
+
+    def get_positions(self, **kwargs):
+        """
+        Get aggregated positions
+
+        :kwarg currently_owned: get only positions with shares held (default: True)
+        :return: QuerySet of Positions ordered by stock
+        """
+        positions = Position.objects.filter(owner=self)
+        if kwargs.get("currently_owned", True):
+            positions = positions.filter(quantity__gt=0)
+        return positions.order_by("stock")
 
     def get_transactions(self, **kwargs):
         """
@@ -124,6 +250,57 @@ class Trader(AbstractBaseUser):
 
         return filtered
 
+    def get_transactions_page(self, **kwargs):
+        """
+        Get one page of transactions, newest first, using keyset pagination
+
+        :kwarg sold: get only sold (True) or currently owned (False) transactions (default: both)
+        :kwarg cursor: cursor returned with the previous page (default: first page)
+        :kwarg limit: page size (default: 25)
+        :raises ValueError: if the cursor is malformed
+        :return: tuple of list of Transactions and cursor of the next page (None on the last page)
+        """
+        sold = kwargs.get("sold")
+        cursor = kwargs.get("cursor")
+        limit = kwargs.get("limit", 25)
+
+        filtered = Transaction.objects.filter(owner=self)
+        if sold is not None:
+            filtered = filtered.filter(sold=sold)
+        if cursor:
+            date, pk = decode_cursor(cursor)
+            filtered = filtered.filter(Q(date_purchased__lt=date) | Q(date_purchased=date, pk__lt=pk))
+
+        # Fetch one extra row to know whether another page follows
+        page = list(filtered.order_by("-date_purchased", "-pk")[:limit + 1])
+        if len(page) > limit:
+            return page[:limit], encode_cursor(page[limit - 1])
+        return page, None
+
+def encode_cursor(transaction):
+    """
+    Encode the keyset position of a transaction as an opaque page cursor
+
+    :param transaction: last Transaction of a page
+    :return: str cursor
+    """
+    key = f"{transaction.date_purchased.isoformat()}|{transaction.pk}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    """
+    Decode a page cursor
+
+    :param cursor: str cursor from encode_cursor
+    :raises ValueError: if the cursor is malformed
+    :return: tuple of date purchased and pk
+    """
+    try:
+        date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date), int(pk)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
 class Transaction(models.Model):
     owner = models.ForeignKey("Trader", on_delete=models.CASCADE)
     stock = models.CharField(max_length=10)
@@ -132,4 +309,29 @@ class Transaction(models.Model):
     price_sold = models.FloatField(blank=True, null=True)
     date_sold = models.DateTimeField(blank=True, null=True)
     sold = models.BooleanField(default=False)
-    
\ No newline at end of file
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "sold", "date_purchased"]),
+            # Pages of every transaction (no sold filter), in get_transactions_page order
+            models.Index(fields=["owner", "date_purchased", "id"]),
+        ]
+
+class Position(models.Model):
+    owner = models.ForeignKey("Trader", on_delete=models.CASCADE)
+    stock = models.CharField(max_length=10)
+    quantity = models.IntegerField(default=0)
+    cost_basis = models.FloatField(default=0.0)
+    realized = models.FloatField(verbose_name="realized P&L", default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "stock"], name="unique_position"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.stock} x{self.quantity}"
+
+    @property
+    def average_cost(self):
+        return self.cost_basis / self.quantity if self.quantity else 0.0
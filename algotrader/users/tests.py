@@ -1,3 +1,73 @@
+import base64
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Trader, Transaction, decode_cursor
+
+
+class TransactionPageTests(TestCase):
+    def setUp(self):
+        self.trader = Trader.objects.create_user("trader", "trader@example.com", "password")
+        start = timezone.now()
+        transactions = [
+            Transaction.objects.create(owner=self.trader, stock="AAPL", price_purchased=100.0, sold=i % 2 == 0)
+            for i in range(7)
+            ]
+        # Three pairs of equal timestamps, so pages have to break ties on pk
+        for i, transaction in enumerate(transactions):
+            transaction.date_purchased = start + timedelta(seconds=i // 2)
+            Transaction.objects.filter(pk=transaction.pk).update(date_purchased=transaction.date_purchased)
+        self.expected = [t.pk for t in sorted(transactions, key=lambda t: (t.date_purchased, t.pk), reverse=True)]
+
+    def pages(self, **kwargs):
+        pks, cursor = [], None
+        while True:
+            page, cursor = self.trader.get_transactions_page(cursor=cursor, **kwargs)
+            pks.append([t.pk for t in page])
+            if cursor is None:
+                return pks
+
+    def test_pages_cover_equal_timestamps_once(self):
+        pages = self.pages(limit=2)
+
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_last_page(self):
+        # A full last page ends the listing without an empty page after it
+        self.assertEqual(self.pages(limit=7), [self.expected])
+        self.assertEqual(self.pages(limit=100), [self.expected])
+
+    def test_sold_filter(self):
+        sold = {t.pk for t in Transaction.objects.filter(sold=True)}
+        pages = self.pages(sold=True, limit=3)
+
+        self.assertEqual(sum(pages, []), [pk for pk in self.expected if pk in sold])
+
+    def test_malformed_cursors(self):
+        for cursor in ["not base64!", base64.urlsafe_b64encode(b"2020-01-01").decode(), base64.urlsafe_b64encode(b"yesterday|1").decode(), base64.urlsafe_b64encode(b"2020-01-01|x").decode(), base64.urlsafe_b64encode(b"\xff\xfe").decode()]:
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
+
+    def test_view_rejects_malformed_cursor(self):
+        self.client.force_login(self.trader)
+
+        response = self.client.get("/profile/transactions/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/profile/transactions/", {"limit": 5})
+        data = response.json()
+        self.assertEqual([t["id"] for t in data["results"]], self.expected[:5])
+        data = self.client.get("/profile/transactions/", {"limit": 5, "cursor": data["next"]}).json()
+        self.assertEqual(([t["id"] for t in data["results"]], data["next"]), (self.expected[5:], None))
+
+    def test_unfiltered_page_uses_index(self):
+        query = str(Transaction.objects.filter(owner=self.trader).order_by("-date_purchased", "-pk")[:26].query)
+        with connection.cursor() as cursor:
+            plan = " ".join(str(row) for row in cursor.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
 
-# Create your tests here.
+        self.assertIn("users_trans_owner_i_093a5e_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
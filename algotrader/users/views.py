@@ -1,7 +1,23 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.views import redirect_to_login
+from trades.models import Order
+from trades.quotes import aget_price, aget_prices
 from .forms import RegisterForm, TraderAuthenticationForm
+from .models import Transaction
+
+async def get_authenticated_user(request):
+    """
+    Resolve request.user outside the event loop (it may hit the database)
+
+    :return: Trader, or None for anonymous users
+    """
+    def resolve():
+        return request.user if request.user.is_authenticated else None
+    return await sync_to_async(resolve)()
 
 # Create your views here.
 def register_view(request):
@@ -37,23 +53,115 @@ def logout_view(request):
     logout(request)
     return redirect("login")
 
-@login_required
-def profile_view(request):
+def _sell_stock(user, id):
+    return Transaction.objects.get(pk=id, owner=user).stock
+
+def _update_transaction(user, submit, id, price):
+    if submit == "Cancel":
+        Order.cancel(user, id)
+    elif submit == "Delete":
+        user.delete(id)
+    else:
+        user.sell(id, price=price)
+
+def _transactions_page(user, sold, cursor):
+    try:
+        return user.get_transactions_page(sold=sold, cursor=cursor)
+    except ValueError:
+        # Stale or tampered cursor, start from the newest page
+        return user.get_transactions_page(sold=sold)
+
+def _profile_context(user, owned_cursor=None, sold_cursor=None):
+    owned_ts, owned_next = _transactions_page(user, False, owned_cursor)
+    sold_ts, sold_next = _transactions_page(user, True, sold_cursor)
+    positions = list(user.get_positions())
+    orders = list(Order.objects.filter(owner=user, status="open").order_by("-created"))
+    balance = "{:.2f}".format(user.balance)
+
+    return {"owned_ts": owned_ts,
+            "sold_ts": sold_ts, 
+            "owned_next": owned_next,
+            "sold_next": sold_next,
+            "owned_cursor": owned_cursor,
+            "sold_cursor": sold_cursor,
+            "positions": positions,
+            "orders": orders,
+            "balance": balance}
+
+def _value_positions(positions, prices, balance):
+    """
+    Attach market value and unrealized P&L to positions
+
+    :return: total account value (cash plus every position that could be priced)
+    """
+    total = balance
+    for p in positions:
+        p.price = prices.get(p.stock)
+        if p.price is None:
+            p.market_value = p.unrealized = None
+            continue
+        p.market_value = p.price * p.quantity
+        p.unrealized = p.market_value - p.cost_basis
+        total += p.market_value
+    return total
+
+async def profile_view(request):
+    user = await get_authenticated_user(request)
+    if not user:
+        return redirect_to_login(request.get_full_path())
+
     if request.method == "POST":
         submit = request.POST["submit"]
         id = request.POST["id"]
-        if submit == "Delete":
-            request.user.delete(id)
-        else:
-            request.user.sell(id)
 
-    transactions = request.user.get_transactions()
-    transactions = list(reversed(transactions))
+        # Fetch the sale price on the event loop instead of inside the DB thread
+        price = None
+        try:
+            if submit == "Sell":
+                stock = await sync_to_async(_sell_stock)(user, id)
+                price = await aget_price(stock)
+            await sync_to_async(_update_transaction)(user, submit, id, price)
+        except (Transaction.DoesNotExist, ValueError):
+            # Someone else's transaction, or a resubmitted form for a share already sold
+            pass
+
+    context = await sync_to_async(_profile_context)(
+        user,
+        owned_cursor=request.GET.get("owned"),
+        sold_cursor=request.GET.get("sold")
+        )
+
+    # Price every held ticker in one batched lookup
+    prices = await aget_prices([p.stock for p in context["positions"]])
+    total = _value_positions(context["positions"], prices, user.balance)
+    context["total_value"] = "{:.2f}".format(total)
+
+    return render(request, "users/profile.html", context)
+
+@login_required
+def transactions_view(request):
+    sold = request.GET.get("sold")
+    if sold is not None:
+        sold = sold.lower() in ("1", "true", "yes")
+
+    try:
+        limit = min(max(int(request.GET.get("limit", 25)), 1), 100)
+        transactions, next_cursor = request.user.get_transactions_page(
+            sold=sold,
+            cursor=request.GET.get("cursor"),
+            limit=limit
+            )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor or limit"}, status=400)
 
-    owned_ts = [t for t in transactions if not t.sold]
-    sold_ts = [t for t in transactions if t.sold]
-    balance = "{:.2f}".format(request.user.balance)
+    results = [{
+        "id": t.pk,
+        "stock": t.stock,
+        "price_purchased": t.price_purchased,
+        "date_purchased": t.date_purchased.isoformat(),
+        "price_sold": t.price_sold,
+        "date_sold": t.date_sold.isoformat() if t.date_sold else None,
+        "sold": t.sold,
+    } for t in transactions]
 
-    return render(request, "users/profile.html", {"owned_ts": owned_ts,
-                                                  "sold_ts": sold_ts, 
-                                                  "balance": balance})
+    return JsonResponse({"results": results, "next": next_cursor})